@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, Mapping, Optional, Sequence
+
+from .config import SESSION_MINUTES
+from .models import Course
+
+
+def _water_fill(names: Sequence[str], room: Mapping[str, float], weight: Mapping[str, float], free: float) -> Dict[str, float]:
+    # Visit courses by how soon they hit their cap; a course capped at the
+    # current level keeps its cap and the level rises for the others
+    quota: Dict[str, float] = {}
+    free_weight = sum(weight[name] for name in names)
+    for name in sorted(names, key=lambda n: (room[n] / weight[n] if weight[n] else math.inf, n)):
+        share = free * weight[name] / free_weight if free_weight else 0.0
+        quota[name] = min(share, float(room[name]))
+        free -= quota[name]
+        free_weight -= weight[name]
+    return quota
+
+
+def allocate_units(
+    priorities: Mapping[str, float],
+    units: int,
+    minimum: Optional[Mapping[str, int]] = None,
+    maximum: Optional[Mapping[str, int]] = None,
+    credit: Optional[Dict[str, float]] = None,
+) -> Dict[str, int]:
+    """
+    Split `units` whole sessions between courses in proportion to their priority.
+    Every course first gets its `minimum`; the rest is water-filled by priority,
+    never past a course's `maximum`; zero-priority courses only take what the
+    others can't. Fractional quotas are then rounded with the
+    largest-remainder method (ties broken by course name), so the result sums to
+    `units` unless every course is at its maximum.
+    `credit` carries each course's rounding remainder from call to call; pass the
+    same dict for consecutive days so rounding evens out over the plan.
+    Runs in O(C log C) for C courses.
+    """
+    minimum = minimum or {}
+    maximum = maximum or {}
+    names = sorted(priorities)
+    lo = {name: minimum.get(name, 0) for name in names}
+    if sum(lo.values()) > units:
+        raise ValueError("Minimum hours per day exceed the daily study hours.")
+    room = {name: max(0, maximum.get(name, units) - lo[name]) for name in names}
+    weight = {name: max(0.0, float(priorities[name])) for name in names}
+    if not any(weight.values()):
+        weight = dict.fromkeys(names, 1.0)
+
+    quota = _water_fill(names, room, weight, float(units - sum(lo.values())))
+    free = units - sum(lo.values()) - sum(quota.values())
+    if free > 1e-9:
+        # Every course with priority is capped; spread the rest over the others
+        spare = {name: room[name] - quota[name] for name in names}
+        for name, share in _water_fill(names, spare, dict.fromkeys(names, 1.0), free).items():
+            quota[name] += share
+    total = int(round(sum(quota.values())))
+
+    if credit is not None:
+        for name in names:
+            quota[name] = min(float(room[name]), max(0.0, quota[name] + credit.get(name, 0.0)))
+    base = {name: int(math.floor(quota[name] + 1e-9)) for name in names}
+
+    # Largest remainder: hand out (or take back) the units lost to rounding
+    order = sorted(names, key=lambda n: (base[n] - quota[n], n))
+    extra = total - sum(base.values())
+    for name in order:
+        if extra <= 0:
+            break
+        if base[name] < room[name]:
+            base[name] += 1
+            extra -= 1
+    for name in reversed(order):
+        if extra >= 0:
+            break
+        if base[name] > 0:
+            base[name] -= 1
+            extra += 1
+
+    if credit is not None:
+        credit.clear()
+        for name in names:
+            # A capped course can't use credit, so don't let it build up
+            if base[name] < room[name]:
+                credit[name] = quota[name] - base[name]
+    return {name: lo[name] + base[name] for name in names}
+
+
+class DailyAllocator:
+    """
+    Hands out a fixed daily budget in whole sessions, day after day.
+    The budget is a hard cap: minutes that don't fill a session stay unused.
+    Per-course limits come from `Course.min_hours_per_day` / `max_hours_per_day`.
+    On a day shortened below the minimums (see `allocate`) they are skipped,
+    and `minimums_met` is False until the next call.
+    """
+
+    def __init__(self, daily_hours: float, courses: Sequence[Course], session_minutes: int = SESSION_MINUTES) -> None:
+        self.session_minutes = session_minutes
+        self.units = int(float(daily_hours) * 60 // session_minutes)
+        self.unused_minutes = float(daily_hours) * 60 - self.units * session_minutes
+        self.minimum: Dict[str, int] = {}
+        self.maximum: Dict[str, int] = {}
+        for course in courses:
+            self.minimum[course.name] = int(math.ceil(course.min_hours_per_day * 60 / session_minutes - 1e-9))
+            if course.max_hours_per_day is not None:
+                self.maximum[course.name] = int(math.floor(course.max_hours_per_day * 60 / session_minutes + 1e-9))
+                if self.maximum[course.name] < self.minimum[course.name]:
+                    raise ValueError(f"{course.name}: maximum hours per day are below the minimum.")
+        self.credit: Dict[str, float] = {}
+        self.minimums_met = True
+
+    def allocate(self, priorities: Mapping[str, float], sessions: Optional[int] = None) -> Dict[str, float]:
+        """
+        One day's hours per course (multiples of the session length).
+        `sessions` lowers the day's budget, e.g. to what fits the day's availability.
+        If that leaves too few sessions for the per-course minimums, the day is
+        split by priority alone; minimums above the full daily budget are an error.
+        """
+        units = self.units if sessions is None else min(self.units, sessions)
+        needed = sum(self.minimum.get(name, 0) for name in priorities)
+        self.minimums_met = needed <= units or units == self.units
+        minimum = self.minimum if self.minimums_met else None
+        units = allocate_units(priorities, units, minimum, self.maximum, self.credit)
+        return {name: n * self.session_minutes / 60 for name, n in units.items()}
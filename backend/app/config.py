@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Pre-built StudyEngines kept per cram_mode value
+ENGINE_POOL_SIZE = _env_int("STUDY_ENGINE_POOL_SIZE", 4)
+
+# Canonical topic attributes -> fired rules; 0 disables the cache
+SCORE_CACHE_SIZE = _env_int("STUDY_SCORE_CACHE_SIZE", 4096)
+
+# Processes running generate_schedule; 0 runs it on a thread instead
+SCHEDULER_WORKERS = _env_int("STUDY_SCHEDULER_WORKERS", min(4, os.cpu_count() or 1))
+# Jobs allowed in flight before /api/generate answers 503
+SCHEDULER_MAX_PENDING = _env_int("STUDY_SCHEDULER_MAX_PENDING", 32)
+# Seconds suggested to clients in Retry-After when the queue is full
+RETRY_AFTER_SECONDS = _env_int("STUDY_RETRY_AFTER_SECONDS", 2)
+# Students per worker job in /api/generate/batch
+BATCH_CHUNK_SIZE = _env_int("STUDY_BATCH_CHUNK_SIZE", 25)
+
+# Generated schedules kept for download. With STUDY_STORE_PATH set they go to a
+# SQLite file shared by all uvicorn workers; otherwise they stay in process memory.
+STORE_PATH = os.environ.get("STUDY_STORE_PATH", "")
+STORE_TTL_SECONDS = _env_int("STUDY_STORE_TTL_SECONDS", 24 * 3600)
+STORE_MAX_ENTRIES = _env_int("STUDY_STORE_MAX_ENTRIES", 1000)
+
+# Serialized /api/generate responses cached by canonical request; 0 disables the cache
+RESPONSE_CACHE_SIZE = _env_int("STUDY_RESPONSE_CACHE_SIZE", 512)
+RESPONSE_CACHE_TTL_SECONDS = _env_int("STUDY_RESPONSE_CACHE_TTL_SECONDS", 3600)
+
+# 1 ships /api/generate results from the workers as plain dicts and serializes them
+# once with orjson (json if it isn't installed); stored schedules are validated on first read
+FAST_RESPONSES = bool(_env_int("STUDY_FAST_RESPONSES", 0))
+
+# Rendered PDFs cached by schedule content; evicted PDFs spill to the directory if set,
+# which is itself trimmed least recently used first past PDF_SPILL_BYTES
+PDF_CACHE_BYTES = _env_int("STUDY_PDF_CACHE_BYTES", 64 * 1024 * 1024)
+PDF_CACHE_DIR = os.environ.get("STUDY_PDF_CACHE_DIR", "")
+PDF_SPILL_BYTES = _env_int("STUDY_PDF_SPILL_BYTES", 512 * 1024 * 1024)
+
+# Characters buffered per chunk when streaming CSV downloads
+CSV_CHUNK_SIZE = _env_int("STUDY_CSV_CHUNK_SIZE", 64 * 1024)
+
+# PDF backend tried first: "auto" (ReportLab, then WeasyPrint, then text), "reportlab", "weasyprint" or "text"
+PDF_BACKEND = os.environ.get("STUDY_PDF_BACKEND", "auto")
+# "background" imports and warms up the PDF backend at startup; "lazy" loads it on
+# the first PDF download only (CSV-only deployments never load a PDF library)
+PDF_WARMUP = os.environ.get("STUDY_PDF_WARMUP", "background")
+
+# Default study session length in minutes; schedules are built from whole sessions
+SESSION_MINUTES = _env_int("STUDY_SESSION_MINUTES", 25)
+
+# Minimum break between two study sessions, in minutes
+BREAK_MINUTES = _env_int("STUDY_BREAK_MINUTES", 10)
+
+# Default course scorer: "simple" (confidence/credit formula), "compiled", "experta" or "vectorized" (rule engine)
+SCORER = os.environ.get("STUDY_SCORER", "simple")
+
+# Stage timers, rule-fire and cache counters served at /metrics; 0 turns them off
+METRICS_ENABLED = bool(_env_int("STUDY_METRICS", 1))
+
+# Shared secret for admin-only features (sent as X-Admin-Token); empty disables them
+ADMIN_TOKEN = os.environ.get("STUDY_ADMIN_TOKEN", "")
+# Request profiles (?profile=1) kept in memory for download
+PROFILE_KEEP = _env_int("STUDY_PROFILE_KEEP", 20)
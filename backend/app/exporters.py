@@ -2,10 +2,25 @@ from __future__ import annotations
 
 import io
 import csv
+import hashlib
+import importlib
+import logging
+import os
 import re
-from typing import Optional, Tuple
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from itertools import groupby
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
 
-from .models import GenerateResponse
+from .config import CSV_CHUNK_SIZE, PDF_BACKEND, PDF_CACHE_BYTES, PDF_CACHE_DIR, PDF_SPILL_BYTES, STORE_MAX_ENTRIES
+from .metrics import METRICS
+from .models import DailyAllocation, GenerateResponse, StoredPlan
+from .store import ScheduleStore
+
+logger = logging.getLogger(__name__)
 
 
 def sanitize_filename(name: str) -> str:
@@ -14,177 +29,457 @@ def sanitize_filename(name: str) -> str:
     return safe or "student"
 
 
-class ExportRegistry:
+class AllocationRow(NamedTuple):
+    """One (day, course, hours) line of a schedule, normalized for the exporters."""
+    day_index: int
+    day: str
+    course: str
+    hours: float
+
+
+def allocation_rows(resp: GenerateResponse) -> Tuple[AllocationRow, ...]:
+    """Flatten a schedule into rows once; every exporter reads these."""
+    rows = []
+    for day_index, daily in enumerate(resp.schedule):
+        # Calendar plans repeat weekdays, so label their days with the date
+        day = f"{daily.day} {daily.date.isoformat()}" if daily.date else daily.day
+        for alloc in daily.allocations:
+            # Support both dict-like and pydantic model allocations
+            course = getattr(alloc, "course", None)
+            hours = getattr(alloc, "hours", None)
+            if course is None and isinstance(alloc, dict):
+                course = alloc.get("course", "")
+            if hours is None and isinstance(alloc, dict):
+                hours = alloc.get("hours", 0)
+            rows.append(AllocationRow(day_index, day, course or "", hours or 0))
+    return tuple(rows)
+
+
+def _rows_by_day(rows: Sequence[AllocationRow]) -> Iterator[List[AllocationRow]]:
+    for _, day_rows in groupby(rows, key=attrgetter("day_index")):
+        yield list(day_rows)
+
+
+class PreparedSchedule(NamedTuple):
+    digest: str
+    rows: Tuple[AllocationRow, ...]
+
+
+class LoadedSchedule(NamedTuple):
+    """A stored schedule with its export rows, loaded once per download."""
+    resp: GenerateResponse
+    prepared: PreparedSchedule
+
+    def filename(self, extension: str) -> str:
+        return f"{sanitize_filename(self.resp.student_name)}_schedule.{extension}"
+
+
+class _CsvSink:
+    """Write target for csv.writer that collects text until it is taken."""
+
     def __init__(self) -> None:
-        self._last: Optional[GenerateResponse] = None
-
-    def store_last(self, resp: GenerateResponse) -> None:
-        self._last = resp
-
-    def export_csv(self) -> Tuple[Optional[bytes], str]:
-        if not self._last:
-            return None, "schedule.csv"
-
-        buf = io.StringIO()
-        writer = csv.writer(buf)
-        writer.writerow(["Day", "Course", "Hours"])
-
-        for daily in self._last.schedule:
-            for alloc in daily.allocations:
-                # Support both dict-like and pydantic model allocations
-                course = getattr(alloc, "course", None)
-                hours = getattr(alloc, "hours", None)
-                if course is None and isinstance(alloc, dict):
-                    course = alloc.get("course", "")
-                if hours is None and isinstance(alloc, dict):
-                    hours = alloc.get("hours", 0)
-                writer.writerow([daily.day, course or "", hours or 0])
-
-        filename = f"{sanitize_filename(self._last.student_name)}_schedule.csv"
-        return buf.getvalue().encode("utf-8"), filename
-
-    def export_pdf(self) -> Tuple[Optional[bytes], str]:
-        if not self._last:
-            return None, "schedule.pdf"
-        filename = f"{sanitize_filename(self._last.student_name)}_schedule.pdf"
-
-        # First try: ReportLab table (reliable PDF without extra deps)
-        try:
-            from reportlab.lib import colors  # type: ignore
-            from reportlab.lib.pagesizes import A4  # type: ignore
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer  # type: ignore
-            from reportlab.lib.styles import getSampleStyleSheet  # type: ignore
-
-            buf = io.BytesIO()
-            doc = SimpleDocTemplate(buf, pagesize=A4, leftMargin=36, rightMargin=36, topMargin=36, bottomMargin=36)
-            styles = getSampleStyleSheet()
-            story = []
-
-            title = Paragraph(f"<para align='center'><b>{self._last.student_name} Study Timetable</b></para>", styles['Title'])
-            sub = Paragraph(
-                f"<para align='center'>Level: {self._last.academic_level} &nbsp;&nbsp; Semester: {self._last.semester}</para>",
-                styles['Normal']
-            )
-            meta = Paragraph(f"<para align='center'>Total Weekly Hours: {self._last.total_weekly_hours}</para>", styles['Normal'])
-            story.extend([title, Spacer(1, 6), sub, meta, Spacer(1, 12)])
-
-            data = [["Day", "Course", "Hours"]]
-            row_spans = []  # collect (start_row, end_row, col) spans for 'Day'
-            current_row = 1
-            for daily in self._last.schedule:
-                if not daily.allocations:
-                    continue
-                start = current_row
-                for idx, alloc in enumerate(daily.allocations):
-                    course = getattr(alloc, 'course', None)
-                    hours = getattr(alloc, 'hours', None)
-                    if course is None and isinstance(alloc, dict):
-                        course = alloc.get('course', '')
-                    if hours is None and isinstance(alloc, dict):
-                        hours = alloc.get('hours', 0)
-                    row = [daily.day if idx == 0 else "", course or '', f"{hours} hrs"]
-                    data.append(row)
-                    current_row += 1
-                end = current_row - 1
-                if end > start:
-                    row_spans.append((start, end, 0))  # span Day column
-
-            table = Table(data, colWidths=[100, 320, 70])
-            style_cmds = [
-                ('GRID', (0,0), (-1,-1), 0.6, colors.HexColor('#243055')),
-                ('BACKGROUND', (0,0), (-1,0), colors.Color(1,1,1,0.05)),
-                ('ALIGN', (0,0), (-1,0), 'LEFT'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ]
-            for start, end, col in row_spans:
-                style_cmds.append(('SPAN', (col, start), (col, end)))
-                style_cmds.append(('FONTNAME', (col, start), (col, end), 'Helvetica-Bold'))
-            table.setStyle(TableStyle(style_cmds))
-
-            story.append(table)
-            doc.build(story)
-            return buf.getvalue(), filename
-        except Exception:
-            pass
-
-        # Fallback: WeasyPrint (if installed)
+        self.parts: List[str] = []
+        self.size = 0
+
+    def write(self, text: str) -> None:
+        self.parts.append(text)
+        self.size += len(text)
+
+    def take(self) -> str:
+        text = "".join(self.parts)
+        self.parts = []
+        self.size = 0
+        return text
+
+
+def iter_csv(rows: Iterable[AllocationRow], chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield schedule rows as UTF-8 CSV in chunks of roughly `chunk_size` characters."""
+    sink = _CsvSink()
+    writer = csv.writer(sink)
+    writer.writerow(["Day", "Course", "Hours"])
+
+    for row in rows:
+        writer.writerow([row.day, row.course, row.hours])
+        if sink.size >= chunk_size:
+            yield sink.take().encode("utf-8")
+
+    rest = sink.take()
+    if rest:
+        yield rest.encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip a byte stream incrementally."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def content_hash(resp: GenerateResponse) -> str:
+    """Digest of the schedule content (the schedule id and scoring time are not part of it)."""
+    payload = resp.model_dump_json(exclude={"schedule_id", "scoring_ms"})
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    """
+    Rendered PDFs keyed by content hash, bounded by total size in bytes (LRU).
+    With `spill_dir` set, evicted PDFs are written there and read back on a miss;
+    the directory is bounded by `spill_bytes` the same way, deleting the least
+    recently used files. Files left by an earlier run are picked up, oldest first.
+    """
+
+    def __init__(
+        self, max_bytes: int = PDF_CACHE_BYTES, spill_dir: str = PDF_CACHE_DIR, spill_bytes: int = PDF_SPILL_BYTES,
+    ) -> None:
+        self.max_bytes = max(0, max_bytes)
+        self.spill_dir = spill_dir
+        self.spill_bytes = max(0, spill_bytes)
+        self.size = 0
+        self.spill_size = 0
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()
+        self._spilled: "OrderedDict[str, int]" = OrderedDict()  # key -> file size
+        self._lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._index_spill_dir()
+
+    def _index_spill_dir(self) -> None:
+        found = []
+        for entry in os.scandir(self.spill_dir):
+            if entry.is_file() and entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name[:-len(".pdf")], stat.st_size))
+        for _, key, size in sorted(found):
+            self._spilled[key] = size
+            self.spill_size += size
+        self._remove(self._trim_spilled())
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.pdf")
+
+    def _trim_spilled(self) -> List[str]:
+        """Drop index entries past `spill_bytes`; the caller deletes their files (lock held)."""
+        dropped = []
+        while self.spill_size > self.spill_bytes and self._spilled:
+            old_key, old_size = self._spilled.popitem(last=False)
+            self.spill_size -= old_size
+            dropped.append(old_key)
+        return dropped
+
+    def _remove(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            try:
+                os.remove(self._spill_path(key))
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            content = self._data.get(key)
+            if content is not None:
+                self._data.move_to_end(key)
+                return content
+        if self.spill_dir:
+            try:
+                with open(self._spill_path(key), "rb") as fh:
+                    content = fh.read()
+            except OSError:
+                return None
+            with self._lock:
+                if key in self._spilled:
+                    self._spilled.move_to_end(key)
+            self.put(key, content)
+            return content
+        return None
+
+    def put(self, key: str, content: bytes) -> None:
+        evicted = []
+        with self._lock:
+            if key in self._data:
+                self.size -= len(self._data.pop(key))
+            self._data[key] = content
+            self.size += len(content)
+            while self.size > self.max_bytes and self._data:
+                old_key, old = self._data.popitem(last=False)
+                self.size -= len(old)
+                evicted.append((old_key, old))
+        if not self.spill_dir:
+            return
+        written = []
+        for old_key, old in evicted:
+            if len(old) > self.spill_bytes:
+                continue
+            path = self._spill_path(old_key)
+            if not os.path.exists(path):
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as fh:
+                    fh.write(old)
+                os.replace(tmp, path)
+            written.append((old_key, len(old)))
+        with self._lock:
+            for old_key, old_size in written:
+                self.spill_size -= self._spilled.pop(old_key, 0)
+                self._spilled[old_key] = old_size
+                self.spill_size += old_size
+            dropped = self._trim_spilled()
+        self._remove(dropped)
+
+
+def _pdf_reportlab(resp: GenerateResponse, rows: Sequence[AllocationRow]) -> bytes:
+    """ReportLab table (reliable PDF without extra deps)."""
+    from reportlab.lib import colors  # type: ignore
+    from reportlab.lib.pagesizes import A4  # type: ignore
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer  # type: ignore
+    from reportlab.lib.styles import getSampleStyleSheet  # type: ignore
+
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, leftMargin=36, rightMargin=36, topMargin=36, bottomMargin=36)
+    styles = getSampleStyleSheet()
+    story = []
+
+    title = Paragraph(f"<para align='center'><b>{resp.student_name} Study Timetable</b></para>", styles['Title'])
+    sub = Paragraph(
+        f"<para align='center'>Level: {resp.academic_level} &nbsp;&nbsp; Semester: {resp.semester}</para>",
+        styles['Normal']
+    )
+    meta = Paragraph(f"<para align='center'>Total Weekly Hours: {resp.total_weekly_hours}</para>", styles['Normal'])
+    story.extend([title, Spacer(1, 6), sub, meta, Spacer(1, 12)])
+
+    data = [["Day", "Course", "Hours"]]
+    row_spans = []  # collect (start_row, end_row, col) spans for 'Day'
+    for day_rows in _rows_by_day(rows):
+        start = len(data)
+        for idx, row in enumerate(day_rows):
+            data.append([row.day if idx == 0 else "", row.course, f"{row.hours} hrs"])
+        end = len(data) - 1
+        if end > start:
+            row_spans.append((start, end, 0))  # span Day column
+
+    table = Table(data, colWidths=[100, 320, 70])
+    style_cmds = [
+        ('GRID', (0,0), (-1,-1), 0.6, colors.HexColor('#243055')),
+        ('BACKGROUND', (0,0), (-1,0), colors.Color(1,1,1,0.05)),
+        ('ALIGN', (0,0), (-1,0), 'LEFT'),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ]
+    for start, end, col in row_spans:
+        style_cmds.append(('SPAN', (col, start), (col, end)))
+        style_cmds.append(('FONTNAME', (col, start), (col, end), 'Helvetica-Bold'))
+    table.setStyle(TableStyle(style_cmds))
+
+    story.append(table)
+    doc.build(story)
+    return buf.getvalue()
+
+
+def _pdf_weasyprint(resp: GenerateResponse, rows: Sequence[AllocationRow]) -> bytes:
+    """WeasyPrint rendering of an HTML table (if installed)."""
+    html_rows = []
+    for day_rows in _rows_by_day(rows):
+        first = day_rows[0]
+        html_rows.append(
+            f"<tr><td rowspan='{len(day_rows)}' class='day'>{first.day}</td><td>{first.course}</td><td>{first.hours} hrs</td></tr>"
+        )
+        html_rows.extend(f"<tr><td>{row.course}</td><td>{row.hours} hrs</td></tr>" for row in day_rows[1:])
+
+    html = f"""
+    <html>
+    <head>
+        <meta charset='utf-8'>
+        <style>
+            :root {{ --bg:#0b1020; --surface:#121833; --surface2:#0f1530; --text:#e9ecf5; --muted:#9aa3b2; --border:#243055; }}
+            body {{ background: #0b1020; color: var(--text); font-family: Inter, system-ui, -apple-system, Segoe UI, Roboto, Helvetica, Arial; }}
+            h2 {{ margin: 0 0 6px 0; text-align:center; }}
+            .sub, .meta {{ margin: 0 0 12px 0; font-size: 14px; color: var(--muted); text-align:center; }}
+            .meta {{ margin-top: -8px; }}
+            table {{ width: 100%; border-collapse: collapse; background: var(--surface); }}
+            th, td {{ border: 1px solid var(--border); padding: 8px 10px; text-align: left; }}
+            thead th {{ background: rgba(255,255,255,0.05); }}
+            td.day {{ font-weight: 600; background: rgba(255,255,255,0.02); }}
+        </style>
+    </head>
+    <body>
+        <h2>{resp.student_name} Study Timetable</h2>
+        <p class='sub'><b>Level:</b> {resp.academic_level} &nbsp;&nbsp; <b>Semester:</b> {resp.semester}</p>
+        <p class='meta'><b>Total Weekly Hours:</b> {resp.total_weekly_hours}</p>
+        <table>
+            <thead><tr><th>Day</th><th>Course</th><th>Hours</th></tr></thead>
+            <tbody>{''.join(html_rows)}</tbody>
+        </table>
+    </body>
+    </html>
+    """
+
+    from weasyprint import HTML  # type: ignore
+    pdf_bytes = HTML(string=html).write_pdf()
+    return pdf_bytes
+
+
+def _pdf_text(resp: GenerateResponse, rows: Sequence[AllocationRow]) -> bytes:
+    """Last resort: simple text PDF."""
+    from reportlab.lib.pagesizes import letter  # type: ignore
+    from reportlab.pdfgen import canvas  # type: ignore
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=letter)
+    width, height = letter
+    textobject = c.beginText(40, height - 40)
+    textobject.textLine(f"{resp.student_name} Study Timetable")
+    textobject.textLine(f"Level: {resp.academic_level} | Semester: {resp.semester}")
+    textobject.textLine(f"Total Weekly Hours: {resp.total_weekly_hours}")
+    textobject.textLine("")
+    for row in rows:
+        line = f"{row.day} | {row.course} | {row.hours} hrs"
+        textobject.textLine(line[:120])
+    c.drawText(textobject)
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+# Tried in order. A backend whose library can't be loaded is skipped from then on.
+PDF_BACKENDS: Tuple[Tuple[str, Callable[[GenerateResponse, Sequence[AllocationRow]], bytes]], ...] = (
+    ("reportlab", _pdf_reportlab),
+    ("weasyprint", _pdf_weasyprint),
+    ("text", _pdf_text),
+)
+
+# Modules each backend needs; imported up front by ExportRegistry.warm_up()
+PDF_BACKEND_MODULES: Dict[str, Tuple[str, ...]] = {
+    "reportlab": ("reportlab.platypus", "reportlab.lib.styles", "reportlab.lib.pagesizes"),
+    "weasyprint": ("weasyprint",),
+    "text": ("reportlab.pdfgen.canvas", "reportlab.lib.pagesizes"),
+}
+
+# One-row schedule rendered during warm-up so fonts and style sheets get loaded
+_WARMUP_SCHEDULE = GenerateResponse(
+    student_name="Warm-up",
+    academic_level="-",
+    semester="-",
+    total_weekly_hours=1.0,
+    schedule=[DailyAllocation(day="Monday", allocations=[{"course": "Warm-up", "hours": 1.0}])],
+)
+
+
+def ordered_backends(preferred: str = PDF_BACKEND) -> Tuple[Tuple[str, Callable[[GenerateResponse, Sequence[AllocationRow]], bytes]], ...]:
+    """PDF_BACKENDS with the configured backend moved to the front."""
+    return tuple(sorted(PDF_BACKENDS, key=lambda backend: backend[0] != preferred))
+
+
+class ExportRegistry:
+    def __init__(self, store: ScheduleStore, pdf_cache: Optional[PdfCache] = None, preferred_backend: str = PDF_BACKEND) -> None:
+        self.store = store
+        self.pdf_cache = pdf_cache or PdfCache()
+        self.backends = ordered_backends(preferred_backend)
+        # Name of the backend that produced the last PDF, and backends that can't load
+        self.pdf_backend: Optional[str] = None
+        self.unavailable_backends: Set[str] = set()
+        # Warm-up and first-render durations in milliseconds
+        self.timings: Dict[str, float] = {}
+        self._prepared: "OrderedDict[str, PreparedSchedule]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, resp: GenerateResponse, plan: Optional[StoredPlan] = None) -> str:
+        """Keep a generated schedule (and what it was made from) for later export; returns its schedule id."""
+        schedule_id = self.store.add(resp, plan)
+        self.prepare(schedule_id, resp)
+        return schedule_id
+
+    def save_payload(self, payload: Dict[str, Any], plan: Optional[StoredPlan] = None) -> str:
+        """Like `save` for a plain payload; export rows are built on the first download instead."""
+        return self.store.add_payload(payload, plan)
+
+    def prepare(self, schedule_id: str, resp: GenerateResponse) -> PreparedSchedule:
+        """Content hash and export rows of a stored schedule, built once per schedule id."""
+        with self._lock:
+            prepared = self._prepared.get(schedule_id)
+            if prepared is not None:
+                self._prepared.move_to_end(schedule_id)
+        METRICS.inc("study_cache_lookups_total", cache="export_rows", result="miss" if prepared is None else "hit")
+        if prepared is not None:
+            return prepared
+        prepared = PreparedSchedule(content_hash(resp), allocation_rows(resp))
+        with self._lock:
+            self._prepared[schedule_id] = prepared
+            while len(self._prepared) > STORE_MAX_ENTRIES:
+                self._prepared.popitem(last=False)
+        return prepared
+
+    def load(self, schedule_id: str) -> Optional[LoadedSchedule]:
+        """
+        A stored schedule ready for export, or None if it is unknown or expired.
+        One store lookup; a download passes the result on to the exporters.
+        """
+        resp = self.store.get(schedule_id)
+        if not resp:
+            return None
+        return LoadedSchedule(resp, self.prepare(schedule_id, resp))
+
+    def export_csv(self, loaded: LoadedSchedule) -> Tuple[bytes, str]:
+        chunks, filename = self.iter_csv(loaded)
+        return b"".join(chunks), filename
+
+    def iter_csv(self, loaded: LoadedSchedule) -> Tuple[Iterator[bytes], str]:
+        """Encoded CSV chunks for streaming, without holding the whole file in memory."""
+        return iter_csv(loaded.prepared.rows), loaded.filename("csv")
+
+    def export_pdf(self, loaded: LoadedSchedule, cached: bool = True) -> Tuple[Optional[bytes], str]:
+        """PDF bytes (None if every backend failed) and filename; `cached=False` renders again even if the PDF is cached."""
+        resp, prepared = loaded
+        filename = loaded.filename("pdf")
+        content = self.pdf_cache.get(prepared.digest) if cached else None
+        if cached:
+            METRICS.inc("study_cache_lookups_total", cache="pdf", result="miss" if content is None else "hit")
+        if content is None:
+            start = time.perf_counter()
+            with METRICS.stage("render_pdf"):
+                content = self.render_pdf(resp, prepared.rows)
+            self.timings.setdefault("first_render_ms", (time.perf_counter() - start) * 1000)
+            if content is not None:
+                self.pdf_cache.put(prepared.digest, content)
+        return content, filename
+
+    def warm_up(self) -> Dict[str, float]:
+        """
+        Import the preferred PDF backend and render a one-row schedule, so the
+        first real download doesn't pay for imports and font setup.
+        """
+        name = self.backends[0][0]
+        start = time.perf_counter()
         try:
-            html_rows = ""
-            for daily in self._last.schedule:
-                if not daily.allocations:
-                    continue
-                first = True
-                span = len(daily.allocations)
-                for alloc in daily.allocations:
-                    course = getattr(alloc, 'course', None)
-                    hours = getattr(alloc, 'hours', None)
-                    if course is None and isinstance(alloc, dict):
-                        course = alloc.get('course', '')
-                    if hours is None and isinstance(alloc, dict):
-                        hours = alloc.get('hours', 0)
-                    if first:
-                        html_rows += f"<tr><td rowspan='{span}' class='day'>{daily.day}</td><td>{course}</td><td>{hours} hrs</td></tr>"
-                        first = False
-                    else:
-                        html_rows += f"<tr><td>{course}</td><td>{hours} hrs</td></tr>"
-
-            html = f"""
-            <html>
-            <head>
-                <meta charset='utf-8'>
-                <style>
-                    :root {{ --bg:#0b1020; --surface:#121833; --surface2:#0f1530; --text:#e9ecf5; --muted:#9aa3b2; --border:#243055; }}
-                    body {{ background: #0b1020; color: var(--text); font-family: Inter, system-ui, -apple-system, Segoe UI, Roboto, Helvetica, Arial; }}
-                    h2 {{ margin: 0 0 6px 0; text-align:center; }}
-                    .sub, .meta {{ margin: 0 0 12px 0; font-size: 14px; color: var(--muted); text-align:center; }}
-                    .meta {{ margin-top: -8px; }}
-                    table {{ width: 100%; border-collapse: collapse; background: var(--surface); }}
-                    th, td {{ border: 1px solid var(--border); padding: 8px 10px; text-align: left; }}
-                    thead th {{ background: rgba(255,255,255,0.05); }}
-                    td.day {{ font-weight: 600; background: rgba(255,255,255,0.02); }}
-                </style>
-            </head>
-            <body>
-                <h2>{self._last.student_name} Study Timetable</h2>
-                <p class='sub'><b>Level:</b> {self._last.academic_level} &nbsp;&nbsp; <b>Semester:</b> {self._last.semester}</p>
-                <p class='meta'><b>Total Weekly Hours:</b> {self._last.total_weekly_hours}</p>
-                <table>
-                    <thead><tr><th>Day</th><th>Course</th><th>Hours</th></tr></thead>
-                    <tbody>{html_rows}</tbody>
-                </table>
-            </body>
-            </html>
-            """
-
-            from weasyprint import HTML  # type: ignore
-            pdf_bytes = HTML(string=html).write_pdf()
-            return pdf_bytes, filename
-        except Exception:
-            # Last resort: simple text PDF
+            for module in PDF_BACKEND_MODULES.get(name, ()):
+                importlib.import_module(module)
+        except (ImportError, OSError):
+            self.unavailable_backends.add(name)
+        imported = time.perf_counter()
+        self.render_pdf(_WARMUP_SCHEDULE)
+        done = time.perf_counter()
+        self.timings["warmup_import_ms"] = (imported - start) * 1000
+        self.timings["warmup_render_ms"] = (done - imported) * 1000
+        logger.info(
+            "PDF warm-up: backend=%s import=%.1fms render=%.1fms",
+            self.pdf_backend, self.timings["warmup_import_ms"], self.timings["warmup_render_ms"],
+        )
+        return self.timings
+
+    def render_pdf(self, resp: GenerateResponse, rows: Optional[Sequence[AllocationRow]] = None) -> Optional[bytes]:
+        """Render with the first backend that works, remembering the ones that can't load."""
+        if rows is None:
+            rows = allocation_rows(resp)
+        for name, render in self.backends:
+            if name in self.unavailable_backends:
+                continue
             try:
-                from reportlab.lib.pagesizes import letter  # type: ignore
-                from reportlab.pdfgen import canvas  # type: ignore
-                buf = io.BytesIO()
-                c = canvas.Canvas(buf, pagesize=letter)
-                width, height = letter
-                textobject = c.beginText(40, height - 40)
-                textobject.textLine(f"{self._last.student_name} Study Timetable")
-                textobject.textLine(f"Level: {self._last.academic_level} | Semester: {self._last.semester}")
-                textobject.textLine(f"Total Weekly Hours: {self._last.total_weekly_hours}")
-                textobject.textLine("")
-                for daily in self._last.schedule:
-                    for alloc in daily.allocations:
-                        course = getattr(alloc, 'course', None)
-                        hours = getattr(alloc, 'hours', None)
-                        if course is None and isinstance(alloc, dict):
-                            course = alloc.get('course', '')
-                        if hours is None and isinstance(alloc, dict):
-                            hours = alloc.get('hours', 0)
-                        line = f"{daily.day} | {course} | {hours} hrs"
-                        textobject.textLine(line[:120])
-                c.drawText(textobject)
-                c.showPage()
-                c.save()
-                return buf.getvalue(), filename
+                content = render(resp, rows)
+            except (ImportError, OSError):
+                # Missing library (or WeasyPrint's native deps): don't retry it on every request
+                self.unavailable_backends.add(name)
+                continue
             except Exception:
-                return None, filename
+                continue
+            self.pdf_backend = name
+            return content
+        return None
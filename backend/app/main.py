@@ -1,13 +1,51 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hmac
+import json
+import logging
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from fastapi import Body, FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import ValidationError
 
-from .models import GenerateRequest, GenerateResponse
-from .scheduler import generate_schedule
-from .exporters import ExportRegistry
+from .config import ADMIN_TOKEN, BATCH_CHUNK_SIZE, FAST_RESPONSES, PDF_WARMUP, RETRY_AFTER_SECONDS
+from .metrics import METRICS, gauge
+from .profiling import ProfileResult, ProfileStore, profile_call
+from .response_cache import ResponseCache, request_key
+from .models import GenerateRequest, GenerateResponse, ScheduleDelta, SchedulePatch, StoredPlan
+from .scheduler import course_weights, courses_signature, generate_batch, generate_payload, generate_schedule, replan
+from .serialization import dumps
+from .scoring import SCORER_STATS
+from .exporters import ExportRegistry, gzip_chunks
+from .store import make_store
+from .workers import QueueFull, WorkerPool
 
 import base64
 
-app = FastAPI(title="Study Assistant", version="1.0.0")
+_import_started = time.perf_counter()
+logger = logging.getLogger(__name__)
+
+# Dedicated processes for CPU-bound schedule generation
+scheduler_pool = WorkerPool()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    export_registry.timings["startup_ms"] = (time.perf_counter() - _import_started) * 1000
+    logger.info("Startup took %.1fms (PDF warm-up: %s)", export_registry.timings["startup_ms"], PDF_WARMUP)
+    if PDF_WARMUP == "background":
+        threading.Thread(target=export_registry.warm_up, name="pdf-warmup", daemon=True).start()
+    yield
+    scheduler_pool.shutdown()
+
+
+app = FastAPI(title="Study Assistant", version="1.0.0", lifespan=lifespan)
 
 # Allow frontend access (CORS)
 app.add_middleware(
@@ -16,54 +54,391 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Content-Disposition", "ETag", "X-Cache", "X-Profile-Id"],
 )
 
-# Registry for exporting schedules
-export_registry = ExportRegistry()
+# Registry for exporting schedules, keyed by schedule id
+export_registry = ExportRegistry(make_store())
+
+# Serialized /api/generate responses for repeated identical requests
+response_cache = ResponseCache()
+
+
+def _runtime_gauges() -> List[str]:
+    # Values that already live elsewhere, read at scrape time
+    ratios = {}
+    for cache in ("response", "score", "pdf", "export_rows"):
+        hits = METRICS.counter("study_cache_lookups_total", cache=cache, result="hit")
+        misses = METRICS.counter("study_cache_lookups_total", cache=cache, result="miss")
+        ratios[(("cache", cache),)] = hits / (hits + misses) if hits + misses else None
+    scorers = SCORER_STATS.snapshot()
+    return (
+        gauge("study_cache_hit_ratio", "Share of cache lookups that were hits.", ratios)
+        + gauge("study_scorer_calls", "Schedules scored, by scorer.",
+                {(("scorer", name),): stats["calls"] for name, stats in scorers.items()})
+        + gauge("study_scorer_seconds", "Total time spent scoring, by scorer.",
+                {(("scorer", name),): stats["total_ms"] / 1000 for name, stats in scorers.items()})
+        + gauge("study_scheduler_pending_jobs", "Scheduler jobs queued or running.",
+                {(): scheduler_pool.pending})
+        + gauge("study_export_timing_seconds", "PDF exporter startup and warm-up timings.",
+                {(("timing", name.removesuffix("_ms")),): ms / 1000 for name, ms in export_registry.timings.items()})
+    )
+
+
+METRICS.register(_runtime_gauges)
+
+# Profiles taken with ?profile=1, for download by admins
+profile_store = ProfileStore()
+
+
+def _scheduler_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Scheduler is busy. Please retry shortly.",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+def _scheduler_failed(exc: Exception) -> HTTPException:
+    # Bad input surfaces as ValueError and is answered with a 400 by the caller.
+    # A dead worker is worth a retry (the pool starts afresh for the next job);
+    # anything else is a bug on our side
+    if isinstance(exc, BrokenProcessPool):
+        logger.warning("Scheduler worker stopped; the pool is restarted")
+        return HTTPException(
+            status_code=503,
+            detail="Scheduler worker stopped unexpectedly. Please retry shortly.",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+    logger.error("Scheduler job failed", exc_info=exc)
+    return HTTPException(status_code=500, detail="Schedule generation failed unexpectedly.")
+
+
+def _require_admin(request: Request) -> None:
+    token = request.headers.get("x-admin-token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Profiling needs a valid X-Admin-Token header.")
+
+
+def _save_profile(profiled: ProfileResult, label: str) -> Dict[str, Any]:
+    profile_id = profile_store.add(profiled, label)
+    logger.info("Profiled %s: %.1fms, profile %s", label, profiled.summary["total_ms"], profile_id)
+    return dict(profiled.summary, profile_id=profile_id)
 
 
 @app.post("/api/generate", response_model=GenerateResponse)
-def api_generate(req: GenerateRequest):
+async def api_generate(req: GenerateRequest, request: Request, profile: bool = Query(False, include_in_schema=False)):
     """
     Generate a weekly study schedule based on user input.
+    Repeated identical requests (in any course order) are answered from the
+    response cache, with the same schedule id; X-Cache says HIT or MISS.
+    With STUDY_FAST_RESPONSES=1 the worker's plain result is stored and
+    serialized as it is; either way the body matches the GenerateResponse schema.
+    Admins may add `?profile=1` to run it under cProfile; see `/api/profiles`.
     """
+    if profile:
+        _require_admin(request)
+    else:
+        key = request_key(req)
+        cached = response_cache.get(key)
+        if cached is not None:
+            schedule_id, body = cached
+            if await run_in_threadpool(export_registry.store.__contains__, schedule_id):
+                return Response(body, media_type="application/json", headers={"X-Cache": "HIT"})
+            # The schedule expired from the store; generate it again
+            response_cache.discard(key)
     try:
-        result = generate_schedule(req)
-    except Exception as exc:
+        if profile:
+            result, profiled = await scheduler_pool.run(profile_call, generate_schedule, req)
+        elif FAST_RESPONSES:
+            payload = await scheduler_pool.run(generate_payload, req)
+        else:
+            result = await scheduler_pool.run(generate_schedule, req)
+    except QueueFull:
+        raise _scheduler_busy()
+    except ValueError as exc:
         raise HTTPException(status_code=400, detail=f"Schedule generation failed: {exc}")
+    except Exception as exc:
+        raise _scheduler_failed(exc)
 
-    # Store result for later export
-    export_registry.store_last(result)
-    return result
+    plan = StoredPlan(request=req, weights=course_weights(req.courses))
+    if FAST_RESPONSES and not profile:
+        # Plain dicts from the worker: stored as they are and serialized once
+        SCORER_STATS.record(payload["scorer"], payload["scoring_ms"])
+        with METRICS.stage("store"):
+            schedule_id = await run_in_threadpool(export_registry.save_payload, payload, plan)
+        with METRICS.stage("serialize"):
+            body = dumps(payload)
+        response_cache.put(key, schedule_id, body)
+        return Response(body, media_type="application/json", headers={"X-Cache": "MISS"})
 
+    # Scoring runs in the worker process; its timing is reported back on the response
+    SCORER_STATS.record(result.scorer, result.scoring_ms)
+    # Store result, and what it was made from, for later export and re-planning.
+    # Store calls may wait on SQLite, so they run in the thread pool like the sync routes
+    with METRICS.stage("store"):
+        result.schedule_id = await run_in_threadpool(export_registry.save, result, plan)
+    if profile:
+        summary = _save_profile(profiled, f"generate for {req.student_name!r}")
+        return JSONResponse(
+            dict(result.model_dump(mode="json"), profile=summary),
+            headers={"X-Profile-Id": summary["profile_id"]},
+        )
+    with METRICS.stage("serialize"):
+        body = result.model_dump_json().encode("utf-8")
+    response_cache.put(key, result.schedule_id, body)
+    return Response(body, media_type="application/json", headers={"X-Cache": "MISS"})
 
-@app.get("/api/download/csv")
-def api_download_csv():
+
+@app.patch("/api/schedules/{schedule_id}", response_model=ScheduleDelta)
+async def api_replan(schedule_id: str, patch: SchedulePatch):
     """
-    Download the last generated schedule as CSV.
+    Re-plan a stored schedule: change or add courses, remove courses, change
+    avg_hours_per_day, and keep the first `days_completed` days as they were.
+    Returns only the days that changed. The result is stored under a new
+    schedule id; the original schedule is left untouched.
     """
-    content, filename = export_registry.export_csv()
-    if content is None:
-        raise HTTPException(status_code=404, detail="No schedule available. Please generate one first.")
+    entry = await run_in_threadpool(export_registry.store.get_entry, schedule_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Schedule not found or expired. Please generate it again.")
+    resp, plan = entry
+    if plan is None:
+        raise HTTPException(status_code=409, detail="This schedule can't be re-planned. Please generate it again.")
+    try:
+        result, new_plan, changed_days = await scheduler_pool.run(replan, resp, plan, patch)
+    except QueueFull:
+        raise _scheduler_busy()
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Re-planning failed: {exc}")
+    except Exception as exc:
+        raise _scheduler_failed(exc)
+
+    SCORER_STATS.record(result.scorer, result.scoring_ms)
+    with METRICS.stage("store"):
+        new_id = await run_in_threadpool(export_registry.save, result, new_plan)
+    return ScheduleDelta(
+        schedule_id=new_id,
+        base_schedule_id=schedule_id,
+        days=len(result.schedule),
+        changed_days=changed_days,
+        total_weekly_hours=result.total_weekly_hours,
+        per_course_hours=result.per_course_hours,
+        notes=result.notes,
+    )
+
 
-    return {
-        "filename": filename,
-        "content": content.decode("utf-8", errors="replace"),
-        "mime": "text/csv",
-    }
+def _save_batch_result(result: Dict[str, Any], plan: StoredPlan) -> None:
+    # Sets result["schedule_id"]
+    if FAST_RESPONSES:
+        export_registry.save_payload(result, plan)
+    else:
+        result["schedule_id"] = export_registry.save(GenerateResponse.model_validate(result), plan)
 
 
-@app.get("/api/download/pdf")
-def api_download_pdf():
+@app.post("/api/generate/batch")
+async def api_generate_batch(payload: List[Dict[str, Any]] = Body(...)):
     """
-    Download the last generated schedule as PDF.
+    Generate schedules for many students at once.
+    Each item has the shape of a /api/generate request. The response is NDJSON,
+    one line per student as soon as it is ready: {"index": i, "result": {...}}
+    or {"index": i, "error": "..."}. A bad item never fails the whole batch.
     """
-    content, filename = export_registry.export_pdf()
+    if scheduler_pool.pending >= scheduler_pool.max_pending:
+        raise _scheduler_busy()
+
+    invalid = []
+    items = []
+    for index, raw in enumerate(payload):
+        try:
+            items.append((index, GenerateRequest.model_validate(raw)))
+        except ValidationError as exc:
+            invalid.append((index, f"Invalid request: {exc}"))
+
+    requests = dict(items)
+    # Identical course lists end up in the same chunk so they share weights
+    items.sort(key=lambda item: courses_signature(item[1].courses))
+    chunks = [items[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(items), BATCH_CHUNK_SIZE)]
+    slots = asyncio.Semaphore(max(1, scheduler_pool.workers))
+
+    async def run_chunk(chunk):
+        async with slots:
+            while True:
+                try:
+                    return await scheduler_pool.run(generate_batch, chunk)
+                except QueueFull:
+                    await asyncio.sleep(RETRY_AFTER_SECONDS)
+                except Exception as exc:
+                    return [(index, None, None, f"Schedule generation failed: {exc}") for index, _ in chunk]
+
+    async def stream():
+        for index, error in invalid:
+            yield json.dumps({"index": index, "error": error}) + "\n"
+        tasks = [asyncio.create_task(run_chunk(chunk)) for chunk in chunks]
+        try:
+            for done in asyncio.as_completed(tasks):
+                for index, result, weights, error in await done:
+                    if not error:
+                        SCORER_STATS.record(result["scorer"], result["scoring_ms"])
+                        plan = StoredPlan(request=requests[index], weights=weights)
+                        with METRICS.stage("store"):
+                            await run_in_threadpool(_save_batch_result, result, plan)
+                    line = {"index": index, "error": error} if error else {"index": index, "result": result}
+                    yield (dumps(line) + b"\n") if FAST_RESPONSES else (json.dumps(line) + "\n")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """
+    Stage timings, rule fires, cache hit ratios and worker queue depth in the
+    Prometheus text format. Disabled with STUDY_METRICS=0.
+    """
+    if not METRICS.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    return etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """
+    True if an Accept-Encoding header allows gzip: listed (or covered by "*")
+    with a q-value above 0. A malformed q-value counts as a refusal, since a
+    plain body is always acceptable.
+    """
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def _attachment(content: bytes, filename: str, mime: str, etag: str) -> Response:
+    return Response(
+        content=content,
+        media_type=mime,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "ETag": etag,
+        },
+    )
+
+
+@app.get("/api/download/csv/{schedule_id}")
+def api_download_csv(schedule_id: str, request: Request, format: Optional[str] = None):
+    """
+    Download a generated schedule as CSV, streamed row by row.
+    The body is gzip-encoded when the client accepts it.
+    Pass `format=json` for the older {filename, content, mime} JSON shape.
+    """
+    loaded = export_registry.load(schedule_id)
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Schedule not found or expired. Please generate it again.")
+
+    if format == "json":
+        content, filename = export_registry.export_csv(loaded)
+        return {
+            "filename": filename,
+            "content": content.decode("utf-8", errors="replace"),
+            "mime": "text/csv",
+        }
+
+    gzip = _accepts_gzip(request.headers.get("accept-encoding", ""))
+    etag = f'"{loaded.prepared.digest}-csv{"-gz" if gzip else ""}"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    chunks, filename = export_registry.iter_csv(loaded)
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type="text/csv; charset=utf-8", headers=headers)
+
+
+@app.get("/api/download/pdf/{schedule_id}")
+def api_download_pdf(
+    schedule_id: str,
+    request: Request,
+    format: Optional[str] = None,
+    profile: bool = Query(False, include_in_schema=False),
+):
+    """
+    Download a generated schedule as PDF.
+    Pass `format=json` for the older {filename, content_base64, mime} JSON shape.
+    Admins may add `?profile=1` to render it afresh under cProfile; the profile
+    id comes back in the X-Profile-Id header (and the summary in the JSON shape).
+    """
+    if profile:
+        _require_admin(request)
+    loaded = export_registry.load(schedule_id)
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Schedule not found or expired. Please generate it again.")
+    etag = f'"{loaded.prepared.digest}-pdf"'
+    if format != "json" and not profile and _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    summary = None
+    if profile:
+        (content, filename), profiled = profile_call(export_registry.export_pdf, loaded, False)
+        summary = _save_profile(profiled, f"PDF for schedule {schedule_id}")
+    else:
+        content, filename = export_registry.export_pdf(loaded)
     if content is None:
-        raise HTTPException(status_code=404, detail="No schedule available. Please generate one first.")
+        raise HTTPException(status_code=500, detail="PDF rendering failed.")
+
+    if format == "json":
+        body = {
+            "filename": filename,
+            "content_base64": base64.b64encode(content).decode("ascii"),
+            "mime": "application/pdf",
+        }
+        if summary:
+            body["profile"] = summary
+        return body
+    response = _attachment(content, filename, "application/pdf", etag)
+    if summary:
+        response.headers["X-Profile-Id"] = summary["profile_id"]
+    return response
 
-    return {
-        "filename": filename,
-        "content_base64": base64.b64encode(content).decode("ascii"),
-        "mime": "application/pdf",
-    }
+
+@app.get("/api/profiles/{profile_id}", include_in_schema=False)
+def api_download_profile(profile_id: str, request: Request, format: Optional[str] = None):
+    """
+    Download a profile taken with `?profile=1` (admins only). The file loads
+    with `pstats.Stats(path)`, snakeviz and similar tools. Pass `format=json`
+    for the summary instead. Profiles live in the memory of the process that
+    took them; the most recent STUDY_PROFILE_KEEP are kept.
+    """
+    _require_admin(request)
+    entry = profile_store.get(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired.")
+    created, label, profiled = entry
+    if format == "json":
+        return dict(profiled.summary, profile_id=profile_id, label=label, created=created)
+    return Response(
+        content=profiled.raw,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'},
+    )
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+from .config import METRICS_ENABLED
+
+# Upper bounds of the stage duration histogram buckets, in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+# ("observe", stage, seconds) or ("inc", (name, labels), amount), as buffered by capture()
+Event = Tuple[str, Any, float]
+
+_DISABLED = nullcontext()
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str) -> None:
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+
+
+class Metrics:
+    """
+    Stage duration histograms and labelled counters, rendered in the
+    Prometheus text format. When disabled, `stage()` returns a shared no-op
+    context and `observe`/`inc` return at once, so instrumented hot paths pay
+    one attribute check.
+
+    Work done in scheduler worker processes is recorded inside `capture()`
+    and merged into the API process's registry with `merge()`.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._collectors: List[Callable[[], List[str]]] = []
+        self._local = threading.local()
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """Time a block as one observation of stage `name`."""
+        return _StageTimer(self, name) if self.enabled else _DISABLED
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is not None:
+            buffer.append(("observe", stage, seconds))
+            return
+        with self._lock:
+            self._histograms.setdefault(stage, Histogram()).observe(seconds)
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is not None:
+            buffer.append(("inc", key, amount))
+            return
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    @contextmanager
+    def capture(self) -> Iterator[List[Event]]:
+        """Buffer this thread's metrics instead of recording them, e.g. to ship them out of a worker."""
+        events: List[Event] = []
+        self._local.buffer = events
+        try:
+            yield events
+        finally:
+            self._local.buffer = None
+
+    def merge(self, events: List[Event]) -> None:
+        for kind, key, value in events:
+            if kind == "observe":
+                self.observe(key, value)
+            else:
+                name, labels = key
+                self.inc(name, value, **dict(labels))
+
+    def counter(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0.0)
+
+    def register(self, collector: Callable[[], List[str]]) -> None:
+        """Add a callable returning extra exposition lines (gauges read at scrape time)."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            histograms = dict(self._histograms)
+            counters = dict(self._counters)
+
+        lines += [
+            "# HELP study_stage_duration_seconds Time spent per request-handling stage.",
+            "# TYPE study_stage_duration_seconds histogram",
+        ]
+        for stage, hist in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), hist.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'study_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'study_stage_duration_seconds_sum{{stage="{stage}"}} {hist.sum!r}')
+            lines.append(f'study_stage_duration_seconds_count{{stage="{stage}"}} {hist.count}')
+
+        names = sorted({name for name, _ in counters})
+        for name in names:
+            lines.append(f"# TYPE {name} counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(f"{name}{_labels(labels)} {value:g}")
+
+        for collector in self._collectors:
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels) + "}"
+
+
+def gauge(name: str, help_text: str, samples: Dict[Labels, Optional[float]]) -> List[str]:
+    """Exposition lines for one gauge; samples without a value are left out."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    lines += [f"{name}{_labels(labels)} {value:g}" for labels, value in samples.items() if value is not None]
+    return lines
+
+
+METRICS = Metrics()
+
+
+def call_captured(fn: Callable[..., Any], *args: Any) -> Tuple[Any, List[Event]]:
+    """Run `fn` with metrics buffered; used as the job sent to scheduler workers."""
+    with METRICS.capture() as events:
+        result = fn(*args)
+    return result, events
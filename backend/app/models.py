@@ -1,6 +1,25 @@
 from __future__ import annotations
-from typing import List, Dict, Optional
-from pydantic import BaseModel, Field, validator, root_validator
+import datetime as dt
+from typing import Any, List, Dict, Literal, Optional
+from pydantic import BaseModel, Field, model_validator, validator, root_validator
+
+from .config import BREAK_MINUTES, SESSION_MINUTES
+from .metrics import METRICS
+from .syllabus import syllabus_key, topic_graph
+
+
+class Topic(BaseModel):
+    """
+    One syllabus topic. `prereqs` name other topics of the same course.
+    """
+    name: str
+    prereqs: List[str] = []
+    est_hours: float = Field(1.0, gt=0, le=500)
+    difficulty: Optional[float] = Field(None, ge=0, le=1)
+
+
+# Older frontend payloads -> current Course field names
+LEGACY_COURSE_KEYS = {"confidence": "confidence_level", "creditUnit": "credit_unit", "examDate": "exam_date"}
 
 
 class Course(BaseModel):
@@ -11,14 +30,20 @@ class Course(BaseModel):
     name: str
     confidence_level: int = Field(ge=1, le=5)
     credit_unit: int = Field(ge=1, description="Credit units for the course")
+    exam_date: Optional[dt.date] = None  # enables the day-by-day calendar plan
+    min_hours_per_day: float = Field(0.0, ge=0, le=24)
+    max_hours_per_day: Optional[float] = Field(None, gt=0, le=24)
+    # Optional syllabus; must form a prerequisite DAG
+    topics: List[Topic] = []
 
     @root_validator(pre=True)
     def _map_legacy_fields(cls, values):  # type: ignore[override]
         # accept legacy keys from older frontend payloads
-        if "confidence_level" not in values and "confidence" in values:
-            values["confidence_level"] = values.pop("confidence")
-        if "credit_unit" not in values and "creditUnit" in values:
-            values["credit_unit"] = values.pop("creditUnit")
+        for legacy, key in LEGACY_COURSE_KEYS.items():
+            if key not in values and legacy in values:
+                values[key] = values.pop(legacy)
+        if not values.get("exam_date"):
+            values["exam_date"] = None
         # coerce to int safely
         try:
             values["confidence_level"] = int(values.get("confidence_level", 3))
@@ -30,6 +55,38 @@ class Course(BaseModel):
             values["credit_unit"] = 1
         return values
 
+    @validator("topics")
+    def _topics_form_dag(cls, topics):  # type: ignore[override]
+        if topics:
+            topic_graph(syllabus_key(topics))
+        return topics
+
+    def updated(self, changes: Dict[str, Any]) -> "Course":
+        """Copy with `changes` applied (legacy keys accepted) and validated."""
+        changes = {LEGACY_COURSE_KEYS.get(key, key): value for key, value in changes.items()}
+        return Course.model_validate({**self.model_dump(), **changes})
+
+
+Weekday = Literal["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+class AvailabilityWindow(BaseModel):
+    """
+    Time of day the student can study, e.g. 18:00-22:00.
+    `days` lists weekday names ("Monday", ...); empty means every day.
+    An end of 00:00 means midnight.
+    """
+    start: dt.time
+    end: dt.time
+    days: List[Weekday] = []
+
+    @validator("end")
+    def _end_after_start(cls, end, values):  # type: ignore[override]
+        start = values.get("start")
+        if start is not None and end != dt.time(0) and end <= start:
+            raise ValueError("end must be after start")
+        return end
+
 
 class GenerateRequest(BaseModel):
     """
@@ -40,6 +97,35 @@ class GenerateRequest(BaseModel):
     semester: str        # e.g., "First Semester", "Second Semester"
     avg_hours_per_day: float = Field(gt=0, le=24)
     courses: List[Course]
+    # Used when courses carry exam dates: first day of the plan (default: today)
+    start_date: Optional[dt.date] = None
+    cram_mode: bool = False
+    # Length of one study session; daily hours are handed out in whole sessions
+    session_minutes: int = Field(SESSION_MINUTES, ge=5, le=240)
+    break_minutes: int = Field(BREAK_MINUTES, ge=0, le=240)
+    # When to place sessions; empty means 08:00-22:00 every day
+    availability: List[AvailabilityWindow] = []
+    # How courses are weighted; defaults to STUDY_SCORER
+    scorer: Optional[Literal["simple", "compiled", "experta", "vectorized"]] = None
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _timed_validation(cls, values, handler):  # type: ignore[override]
+        # Covers the nested courses and topics too; instances passed on (e.g. into StoredPlan) aren't counted
+        if isinstance(values, cls):
+            return handler(values)
+        with METRICS.stage("validate"):
+            return handler(values)
+
+
+class Session(BaseModel):
+    """
+    One timed study session. An end of 00:00 means midnight.
+    """
+    course: str
+    start: dt.time
+    end: dt.time
+    topic: Optional[str] = None
 
 
 class DailyAllocation(BaseModel):
@@ -47,13 +133,15 @@ class DailyAllocation(BaseModel):
     A single day’s study plan.
     """
     day: str                  # e.g., "Monday"
-    
+    date: Optional[dt.date] = None  # set for calendar plans
+
     class Allocation(BaseModel):
         course: str
         hours: float
 
     allocations: List[Allocation]
     # Example: [{"course": "Mathematics", "hours": 3.0}, {"course": "Physics", "hours": 2.0}]
+    sessions: List[Session] = []
 
 
 class GenerateResponse(BaseModel):
@@ -68,3 +156,50 @@ class GenerateResponse(BaseModel):
     notes: List[str] = []
     # Optional extra breakdown used by the frontend for summaries
     per_course_hours: Optional[Dict[str, float]] = None
+    # Key for /api/download/{csv,pdf}/{schedule_id}; set once the schedule is stored
+    schedule_id: Optional[str] = None
+    # Scorer that weighted the courses and the time it took
+    scorer: Optional[str] = None
+    scoring_ms: Optional[float] = None
+
+
+class StoredPlan(BaseModel):
+    """
+    What a stored schedule was generated from, kept so it can be re-planned.
+    `weights` are the base course weights (`scheduler.course_weights`).
+    """
+    request: GenerateRequest
+    weights: Dict[str, float]
+
+
+class SchedulePatch(BaseModel):
+    """
+    Changes to a stored schedule for PATCH /api/schedules/{schedule_id}.
+    `courses` are matched by name: known courses get the given fields
+    updated, unknown names are added as new courses.
+    """
+    courses: List[Dict[str, Any]] = []
+    remove_courses: List[str] = []
+    avg_hours_per_day: Optional[float] = Field(None, gt=0, le=24)
+    # Leading days already studied; they are kept as planned
+    days_completed: int = Field(0, ge=0)
+
+
+class DayChange(BaseModel):
+    index: int
+    day: DailyAllocation
+
+
+class ScheduleDelta(BaseModel):
+    """
+    Result of a re-plan: only the days that changed, plus the new totals.
+    The re-planned schedule is stored under a new `schedule_id`; the original
+    stays available under `base_schedule_id`.
+    """
+    schedule_id: Optional[str] = None
+    base_schedule_id: str
+    days: int  # length of the re-planned schedule
+    changed_days: List[DayChange]
+    total_weekly_hours: float
+    per_course_hours: Optional[Dict[str, float]] = None
+    notes: List[str] = []
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import cProfile
+import marshal
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, TypeVar
+
+from .config import PROFILE_KEEP
+
+T = TypeVar("T")
+
+# Functions listed in a profile summary, by cumulative time
+SUMMARY_ROWS = 30
+
+# Only one profiler may be active per process on newer Pythons, and a profile
+# of two interleaved requests is hard to read anyway
+_PROFILER_LOCK = threading.Lock()
+
+
+class ProfileResult(NamedTuple):
+    raw: bytes               # marshalled pstats data, the format Stats.dump_stats writes
+    summary: Dict[str, Any]
+
+
+def _function_label(filename: str, line: int, name: str) -> str:
+    if filename == "~":
+        return name  # built-in, e.g. "<method 'sort' of 'list' objects>"
+    parts = filename.replace(os.sep, "/").rsplit("/", 2)
+    return f"{'/'.join(parts[-2:])}:{line}({name})"
+
+
+def summarize(stats: pstats.Stats, limit: int = SUMMARY_ROWS) -> Dict[str, Any]:
+    """The `limit` functions with the most cumulative time, as JSON-friendly rows."""
+    rows: List[Dict[str, Any]] = []
+    for (filename, line, name), (prim_calls, calls, tottime, cumtime, _) in stats.stats.items():  # type: ignore[attr-defined]
+        rows.append({
+            "function": _function_label(filename, line, name),
+            "calls": calls,
+            "primitive_calls": prim_calls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda row: (-row["cumtime_ms"], -row["tottime_ms"], row["function"]))
+    return {
+        "total_calls": stats.total_calls,  # type: ignore[attr-defined]
+        "total_ms": round(stats.total_tt * 1000, 3),  # type: ignore[attr-defined]
+        "top": rows[:limit],
+    }
+
+
+def profile_call(fn: Callable[..., T], *args: Any) -> Tuple[T, ProfileResult]:
+    """
+    Run `fn(*args)` under cProfile. Module-level so it can be sent to
+    scheduler worker processes; the raw profile comes back as bytes.
+    """
+    profiler = cProfile.Profile()
+    with _PROFILER_LOCK:
+        result = profiler.runcall(fn, *args)
+    stats = pstats.Stats(profiler)
+    return result, ProfileResult(marshal.dumps(stats.stats), summarize(stats))  # type: ignore[attr-defined]
+
+
+class ProfileStore:
+    """The last `maxsize` profiles taken in this process, keyed by profile id."""
+
+    def __init__(self, maxsize: int = PROFILE_KEEP) -> None:
+        self.maxsize = max(1, maxsize)
+        self._data: "OrderedDict[str, Tuple[float, str, ProfileResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: ProfileResult, label: str) -> str:
+        profile_id = uuid.uuid4().hex
+        with self._lock:
+            self._data[profile_id] = (time.time(), label, profile)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Tuple[float, str, ProfileResult]]:
+        with self._lock:
+            return self._data.get(profile_id)
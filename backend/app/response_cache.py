@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS
+from .metrics import METRICS
+from .models import GenerateRequest
+
+
+def request_key(req: GenerateRequest, today: Optional[dt.date] = None) -> str:
+    """
+    Digest of a validated request, the same for requests that only differ in
+    course order or in using legacy course keys (already mapped by validation).
+    A missing start_date means today, so it is filled in: the same payload
+    gives a different calendar plan tomorrow.
+    """
+    payload = req.model_dump(mode="json")
+    payload["courses"] = sorted(payload["courses"], key=lambda course: json.dumps(course, sort_keys=True))
+    if payload.get("start_date") is None:
+        payload["start_date"] = (today or dt.date.today()).isoformat()
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Serialized /api/generate responses keyed by `request_key`, with TTL and
+    LRU eviction. Each entry remembers the schedule id it was stored under, so
+    a hit can check the schedule is still downloadable.
+    """
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: int = RESPONSE_CACHE_TTL_SECONDS) -> None:
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        """(schedule id, response body) for `key`, or None."""
+        if not self.maxsize:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] < time.monotonic():
+                del self._data[key]
+                item = None
+            if item is not None:
+                self._data.move_to_end(key)
+        METRICS.inc("study_cache_lookups_total", cache="response", result="miss" if item is None else "hit")
+        return item[1:] if item is not None else None
+
+    def put(self, key: str, schedule_id: str, body: bytes) -> None:
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, schedule_id, body)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import math
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from .config import SCORE_CACHE_SIZE
+from .metrics import METRICS
+
+
+class Range(NamedTuple):
+    """
+    Half-open numeric interval [lo, hi) used as a rule predicate.
+    Omitted bounds are unbounded.
+    """
+    lo: float = -math.inf
+    hi: float = math.inf
+
+    def contains(self, value: Any) -> bool:
+        return _is_number(value) and self.lo <= value < self.hi
+
+
+class RuleSpec(NamedTuple):
+    """
+    One row of the rule table.
+    The rule fires when every field in `when` matches the fact's value: a `Range`
+    must contain it, any other value must be equal to it.
+    """
+    rule_id: str
+    when: Dict[str, Any]
+    boost: float
+    explanation: str
+
+
+# (rule_id, boost, explanation) as recorded by the engines
+Adjustment = Tuple[str, float, str]
+
+
+RULE_TABLE: Tuple[RuleSpec, ...] = (
+    # Urgency rules
+    RuleSpec("URG-01", {"days_to_exam": Range(hi=2)}, 0.50, "Exam is tomorrow: heavy urgency boost"),
+    RuleSpec("URG-02", {"days_to_exam": Range(2, 4)}, 0.35, "Exam in 2-3 days: strong urgency boost"),
+    RuleSpec("URG-03", {"days_to_exam": Range(4, 8)}, 0.20, "Exam in 4-7 days: medium urgency boost"),
+    RuleSpec("URG-04", {"days_to_exam": Range(8, 15)}, 0.10, "Exam in 8-14 days: light urgency boost"),
+    # Mastery rules
+    RuleSpec("MAS-01", {"mastery": Range(hi=0.15)}, 0.40, "Very low mastery (< 0.15): large boost"),
+    RuleSpec("MAS-02", {"mastery": Range(0.15, 0.35)}, 0.25, "Low mastery (0.15-0.35): moderate boost"),
+    RuleSpec("MAS-03", {"mastery": Range(0.35, 0.55)}, 0.10, "Medium mastery (0.35-0.55): small boost"),
+    RuleSpec("MAS-04", {"mastery": Range(0.75)}, -0.20, "High mastery (>= 0.75): reduce focus"),
+    # Difficulty rules
+    RuleSpec("DIF-01", {"difficulty": Range(0.75)}, 0.25, "Very hard topic (>= 0.75)"),
+    RuleSpec("DIF-02", {"difficulty": Range(0.55, 0.75)}, 0.15, "Hard topic (0.55-0.75)"),
+    # Importance rules
+    RuleSpec("IMP-01", {"importance": Range(1.45)}, 0.20, "High-importance course (>= 1.45)"),
+    RuleSpec("IMP-02", {"importance": Range(1.15, 1.45)}, 0.10, "Moderately important course (1.15-1.45)"),
+    # Exam type rules
+    RuleSpec("EXM-01", {"exam_type": "mcq"}, 0.05, "MCQ: frequent short reviews beneficial"),
+    RuleSpec("EXM-02", {"exam_type": "written"}, 0.10, "Written: deeper practice sessions"),
+    RuleSpec("EXM-03", {"exam_type": "practical"}, 0.15, "Practical: hands-on time emphasis"),
+    RuleSpec("EXM-04", {"exam_type": "oral"}, 0.12, "Oral: practice speaking/explaining"),
+    # Prerequisites rules (depth and dependents come from the course's topic DAG)
+    RuleSpec("PRE-01", {"prereq_depth": Range(1, 3)}, 0.10, "Builds on 1-2 levels of prerequisites"),
+    RuleSpec("PRE-02", {"prereq_depth": Range(3)}, 0.15, "Deep prerequisite chain (3+ levels): allow extra time"),
+    RuleSpec("PRE-03", {"dependents": Range(3)}, 0.10, "Many topics build on this one: schedule earlier"),
+    # Spaced repetition rules
+    RuleSpec("SPR-01", {"days_to_exam": Range(21, 31)}, 0.05, "Plenty of time: plan spaced repetition"),
+    # Buffer day rules
+    RuleSpec("BUF-01", {"days_to_exam": Range(hi=3)}, 0.05, "Add buffer/review sessions near exam"),
+    # Combo rules for low mastery + high difficulty
+    RuleSpec("CMB-01", {"mastery": Range(hi=0.35), "difficulty": Range(0.75)}, 0.12, "Low mastery and high difficulty: prioritize"),
+    # Combo rules for high importance + high difficulty
+    RuleSpec("CMB-02", {"importance": Range(1.25), "difficulty": Range(0.75)}, 0.10, "Hard and important: additional boost"),
+    # Penalty rules for very high mastery
+    RuleSpec("PEN-01", {"mastery": Range(0.85)}, -0.10, "Very high mastery: deprioritize"),
+    # Triage rules for very large topics
+    RuleSpec("TRG-01", {"est_hours": Range(16.0)}, -0.05, "Very large topic: may need trimming"),
+    # Additional spaced repetition rules for moderate time
+    RuleSpec("SPR-02", {"days_to_exam": Range(15, 21)}, 0.08, "Moderate time: ensure multiple touches"),
+)
+
+
+def _is_number(value: Any) -> bool:
+    # NaN is excluded: it would otherwise land in the last bucket
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value == value
+
+
+def _freeze(value: Any) -> Any:
+    # Lists (e.g. prereqs) are compared by value, so key them as tuples
+    if isinstance(value, Range):
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _matches(expected: Any, value: Any) -> bool:
+    if isinstance(expected, Range):
+        return expected.contains(value)
+    return _freeze(value) == expected
+
+
+def range_bounds(ranges: Iterable[Range]) -> List[float]:
+    """Sorted finite boundaries splitting the number line into buckets."""
+    return sorted({b for r in ranges for b in (r.lo, r.hi) if math.isfinite(b)})
+
+
+def covered_buckets(bounds: Sequence[float], rng: Range) -> range:
+    """
+    Buckets (as numbered by `bisect_right(bounds, value)`) lying inside `rng`.
+    Bucket i spans [bounds[i - 1], bounds[i]).
+    """
+    first = bisect_right(bounds, rng.lo) if math.isfinite(rng.lo) else 0
+    last = bisect_left(bounds, rng.hi) if math.isfinite(rng.hi) else len(bounds)
+    return range(first, last + 1)
+
+
+def count_fires(fired_per_topic: Iterable[Sequence[Adjustment]], engine: str) -> None:
+    """
+    Add fired rules to study_rule_fires_total with one counter update per rule
+    id rather than per fire; scoring loops call it once per batch.
+    """
+    if not METRICS.enabled:
+        return
+    counts: Dict[str, int] = {}
+    for fired in fired_per_topic:
+        for rule_id, _, _ in fired:
+            counts[rule_id] = counts.get(rule_id, 0) + 1
+    for rule_id, count in counts.items():
+        METRICS.inc("study_rule_fires_total", count, rule_id=rule_id, engine=engine)
+
+
+def urgency_factor(days_to_exam: int, cram_mode: bool) -> float:
+    # Kept here rather than in rules.py so the schedulers don't import Experta
+    if cram_mode:
+        # Strong urgency curve
+        if days_to_exam <= 1:
+            return 2.0
+        if days_to_exam <= 3:
+            return 1.8
+        if days_to_exam <= 7:
+            return 1.6
+        if days_to_exam <= 14:
+            return 1.3
+        return 1.0
+    else:
+        if days_to_exam <= 1:
+            return 1.8
+        if days_to_exam <= 3:
+            return 1.5
+        if days_to_exam <= 7:
+            return 1.3
+        if days_to_exam <= 14:
+            return 1.15
+        return 1.0
+
+
+class CompiledRules:
+    """
+    Dispatch index compiled from a rule table.
+    Each rule is filed under its first field: exact values in a dict keyed by
+    value, ranges in the buckets between the sorted range boundaries of that
+    field (found with bisect). Any remaining fields (combo rules) are checked
+    only for the rules that were looked up, so scoring a fact costs one lookup
+    per indexed field.
+    """
+
+    def __init__(self, table: Tuple[RuleSpec, ...] = RULE_TABLE) -> None:
+        self.table = tuple(table)
+        self.exact: Dict[str, Dict[Any, List[Tuple[int, Tuple[Tuple[str, Any], ...], Adjustment]]]] = {}
+        self.bounds: Dict[str, List[float]] = {}
+        self.buckets: Dict[str, List[List[Tuple[int, Tuple[Tuple[str, Any], ...], Adjustment]]]] = {}
+
+        ranged: Dict[str, List[Tuple[Range, Tuple[int, Tuple[Tuple[str, Any], ...], Adjustment]]]] = {}
+        for pos, spec in enumerate(self.table):
+            (field, value), *rest = spec.when.items()
+            residual = tuple((f, _freeze(v)) for f, v in rest)
+            entry = (pos, residual, (spec.rule_id, spec.boost, spec.explanation))
+            if isinstance(value, Range):
+                ranged.setdefault(field, []).append((value, entry))
+            else:
+                self.exact.setdefault(field, {}).setdefault(_freeze(value), []).append(entry)
+
+        for field, items in ranged.items():
+            bounds = range_bounds(rng for rng, _ in items)
+            buckets: List[List[Tuple[int, Tuple[Tuple[str, Any], ...], Adjustment]]] = [[] for _ in range(len(bounds) + 1)]
+            for rng, entry in items:
+                for i in covered_buckets(bounds, rng):
+                    buckets[i].append(entry)
+            self.bounds[field] = bounds
+            self.buckets[field] = buckets
+
+    def _candidates(self, fact: Mapping[str, Any]):
+        for field, by_value in self.exact.items():
+            if field in fact:
+                yield from by_value.get(_freeze(fact[field]), ())
+        for field, bounds in self.bounds.items():
+            value = fact.get(field)
+            if _is_number(value):
+                yield from self.buckets[field][bisect_right(bounds, value)]
+
+    def match(self, fact: Mapping[str, Any]) -> List[Adjustment]:
+        """Return the adjustments of every rule the fact satisfies, in table order."""
+        hits: List[Tuple[int, Adjustment]] = []
+        for pos, residual, adjustment in self._candidates(fact):
+            if all(f in fact and _matches(v, fact[f]) for f, v in residual):
+                hits.append((pos, adjustment))
+        hits.sort()
+        return [adjustment for _, adjustment in hits]
+
+
+COMPILED_RULES = CompiledRules()
+
+
+class CompiledStudyEngine:
+    """
+    Table-driven counterpart of `rules.StudyEngine`.
+    Records the same `adjustments` and `explanations` without building a Rete network.
+    """
+
+    name = "compiled"
+
+    def __init__(self, cram_mode: bool, rules: Optional[CompiledRules] = None):
+        self.cram_mode = cram_mode
+        self.rules = rules or COMPILED_RULES
+        self.adjustments: Dict[str, List[Adjustment]] = {}
+        self.explanations: List[str] = []
+
+    def record(self, topic_id: str, rule_id: str, boost: float, explanation: str):
+        self.adjustments.setdefault(topic_id, []).append((rule_id, boost, explanation))
+        self.explanations.append(f"{rule_id}: {explanation} (boost {boost:+.2f})")
+
+    def reset(self) -> None:
+        self.adjustments = {}
+        self.explanations = []
+
+    def score(self, fact: Mapping[str, Any]) -> List[Adjustment]:
+        """Fire every matching rule for one topic fact and return its adjustments."""
+        fired = self.rules.match(fact)
+        for rule_id, boost, explanation in fired:
+            self.record(fact["topic_id"], rule_id, boost, explanation)
+        return fired
+
+    def score_topics(self, topics: Iterable[Mapping[str, Any]]) -> Dict[str, List[Adjustment]]:
+        """Score a batch of topic facts; returns adjustments keyed by topic_id."""
+        self.reset()
+        topic_ids = []
+        for topic in topics:
+            topic_ids.append(topic["topic_id"])
+            self.score(topic)
+        count_fires(self.adjustments.values(), self.name)
+        return {topic_id: self.adjustments.get(topic_id, []) for topic_id in topic_ids}
+
+
+# Every fact attribute some rule looks at; nothing else can change the outcome
+SCORED_FIELDS: Tuple[str, ...] = tuple(sorted({field for spec in RULE_TABLE for field in spec.when}))
+
+_MISSING = object()
+# Key part for a value no rule can match (missing, non-numeric for a range, unexpected)
+_NO_MATCH = -1
+
+
+def _field_keys(table: Tuple[RuleSpec, ...], fields: Tuple[str, ...]) -> Tuple[Tuple[str, Any], ...]:
+    # Per field: the sorted range boundaries when every rule tests it with a
+    # range, else the set of values the rules compare it with
+    keys = []
+    for field in fields:
+        values = [_freeze(spec.when[field]) for spec in table if field in spec.when]
+        if values and all(isinstance(v, Range) for v in values):
+            keys.append((field, range_bounds(values)))
+        else:
+            keys.append((field, frozenset(v for v in values if not isinstance(v, Range)) if values else frozenset()))
+    return tuple(keys)
+
+
+class ScoreCache:
+    """
+    Bounded LRU cache from canonical topic attributes to the rules they fire.
+    Keys are built per SCORED_FIELDS value: a range-tested field contributes
+    its bucket between the table's range boundaries, an exact-tested field its
+    value (or a no-match marker). Facts with the same key fire the same rules
+    by construction, so e.g. a calendar plan's slowly changing mastery and
+    remaining hours keep hitting one entry until they cross a boundary.
+    cram_mode is part of the key.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = SCORE_CACHE_SIZE,
+        fields: Tuple[str, ...] = SCORED_FIELDS,
+        table: Tuple[RuleSpec, ...] = RULE_TABLE,
+    ):
+        self.maxsize = max(0, maxsize)
+        self.fields = fields
+        self._field_keys = _field_keys(table, fields)
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[Adjustment, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, fact: Mapping[str, Any], cram_mode: bool) -> Hashable:
+        parts: List[Any] = []
+        for field, expected in self._field_keys:
+            value = fact.get(field, _MISSING)
+            if isinstance(expected, list):
+                parts.append(bisect_right(expected, value) if _is_number(value) else _NO_MATCH)
+            else:
+                value = _freeze(value)
+                parts.append(value if value in expected else _NO_MATCH)
+        parts.append(bool(cram_mode))
+        return tuple(parts)
+
+    def get(self, key: Hashable) -> Optional[Tuple[Adjustment, ...]]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, adjustments: Iterable[Adjustment]) -> None:
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = tuple(adjustments)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def score_topics(self, engine: Any, topics: Iterable[Mapping[str, Any]]) -> Dict[str, List[Adjustment]]:
+        """
+        Like `engine.score_topics`, but only topics missing from the cache reach the engine.
+        Works with both StudyEngine and CompiledStudyEngine. Rules replayed from
+        the cache count as fires of `engine`, like the ones it fires itself.
+        """
+        cram_mode = bool(engine.cram_mode)
+        result: Dict[str, List[Adjustment]] = {}
+        pending: Dict[str, Tuple[Hashable, Mapping[str, Any]]] = {}
+        hits: List[Tuple[Adjustment, ...]] = []
+        for topic in topics:
+            key = self.key(topic, cram_mode)
+            cached = self.get(key)
+            if cached is None:
+                pending[topic["topic_id"]] = (key, topic)
+                result[topic["topic_id"]] = []
+            else:
+                result[topic["topic_id"]] = list(cached)
+                hits.append(cached)
+        if pending:
+            scored = engine.score_topics(topic for _, topic in pending.values())
+            for topic_id, (key, _) in pending.items():
+                result[topic_id] = scored.get(topic_id, [])
+                self.put(key, result[topic_id])
+        # Counted once per call rather than per lookup; this runs for every planned day
+        METRICS.inc("study_cache_lookups_total", len(result) - len(pending), cache="score", result="hit")
+        METRICS.inc("study_cache_lookups_total", len(pending), cache="score", result="miss")
+        count_fires(hits, engine.name)
+        return result
+
+
+SCORE_CACHE = ScoreCache()
@@ -1,63 +1,432 @@
 from __future__ import annotations
-from typing import List, Dict
+import datetime as dt
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
 from .models import (
+    Course,
     GenerateRequest,
     GenerateResponse,
     DailyAllocation,
+    DayChange,
+    SchedulePatch,
+    Session,
+    StoredPlan,
 )
+from .allocator import DailyAllocator
+from .rule_table import urgency_factor
+from .scoring import SCORERS, Timer, course_attributes, explain, get_scorer
+from .syllabus import TopicCursor, syllabus_key, topic_graph
+from .metrics import METRICS
+from .timetable import DAY_NAMES, FreeSlots, plan_sessions, windows_by_day
 
 
-def generate_schedule(req: GenerateRequest) -> GenerateResponse:
-    """
-    Generate a weekly study schedule based on:
-    - average daily study hours
-    - courses, their confidence levels, and credit units
-    Lower confidence and higher credit units receive more time.
-    """
+# Study hours a course needs to reach full mastery, per unit of weight
+HOURS_PER_WEIGHT = 4.0
+# Longest calendar plan accepted, in days
+MAX_PLAN_DAYS = 366
 
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
-    # Step 1: Calculate total weight. Confidence dominates; credit unit is a secondary factor
+def course_weights(courses: Sequence[Course]) -> Dict[str, float]:
+    """
+    Relative study weight per course.
+    Confidence dominates; credit unit is a secondary factor.
+    """
     weights: Dict[str, float] = {}
-    for course in req.courses:
+    for course in courses:
         # Inverse confidence (1-5) -> 5 strongest influence
         inv_conf = float(max(1, 6 - int(course.confidence_level)))
         # Credit unit modulation (each extra unit adds 30% more weight)
         credit = max(1, int(getattr(course, "credit_unit", 1)))
         credit_factor = 1.0 + 0.30 * float(credit - 1)
         weights[course.name] = inv_conf * credit_factor
+    return weights
+
+
+def courses_signature(courses: Sequence[Course]) -> Hashable:
+    """Key identifying a course list for sharing its weights."""
+    return tuple((c.name, int(c.confidence_level), int(c.credit_unit)) for c in courses)
+
+
+def generate_schedule(
+    req: GenerateRequest,
+    weights: Optional[Dict[str, float]] = None,
+    keep: Sequence[DailyAllocation] = (),
+) -> GenerateResponse:
+    """
+    Generate a weekly study schedule based on:
+    - average daily study hours
+    - courses, their confidence levels, and credit units
+    Lower confidence and higher credit units receive more time.
+    `weights` may be passed in when already computed for the same course list.
+    `keep` are leading days taken over unchanged from an earlier plan.
+    """
+
+    if any(course.exam_date for course in req.courses):
+        return generate_calendar(req, weights=weights, keep=keep)
+
+    days = DAY_NAMES
+
+    # Step 1: Calculate course weights, adjusted by the rule engine if the scorer uses it
+    with METRICS.stage("weights"):
+        if weights is None:
+            weights = course_weights(req.courses)
+        scorer = get_scorer(req.scorer)
+        with Timer() as timer:
+            scored = scorer.score(req, weights, {name: HOURS_PER_WEIGHT * w for name, w in weights.items()})
+        weights = scored.weights
+    if scorer.uses_rules:
+        METRICS.observe("rules", timer.elapsed_ms / 1000)
+
+    # Step 2: Hand out each day's hours in whole sessions by weight; rounding
+    # remainders carry over between days so weekly totals stay proportional
+    allocator = DailyAllocator(req.avg_hours_per_day, req.courses, req.session_minutes)
+    windows = windows_by_day(req.availability)
+    short_days: List[str] = []
+    unmet_days: List[str] = []
+    cursors = _topic_cursors(req.courses)
+    course_hours: Dict[str, float] = {name: 0.0 for name in weights}
+    schedule: List[DailyAllocation] = []
+    with METRICS.stage("plan"):
+        for index, day in enumerate(days):
+            if index < len(keep):
+                _replay_day(keep[index], course_hours, cursors, req.session_minutes)
+                schedule.append(keep[index])
+                continue
+            # Step 3: Place the day's hours as timed sessions in the availability windows
+            hours_by_course, sessions = _plan_day(req, allocator, weights, FreeSlots(windows[day]), day, short_days, unmet_days, cursors)
+            allocations = []
+            for course_name, hours in hours_by_course.items():
+                course_hours[course_name] += hours
+                if hours > 0:
+                    allocations.append({
+                        "course": course_name,
+                        "hours": round(hours, 2)
+                    })
+            schedule.append(DailyAllocation(day=day, allocations=allocations, sessions=sessions))
+
+    weekly_hours = sum(course_hours.values())
+    with METRICS.stage("response"):
+        resp = GenerateResponse(
+            student_name=req.student_name,
+            academic_level=req.academic_level,
+            semester=req.semester,
+            total_weekly_hours=round(weekly_hours, 2),
+            per_course_hours={k: round(v, 2) for k, v in course_hours.items()},
+            schedule=schedule,
+            notes=[
+                "Lower confidence and higher credit-unit courses are allocated more study time.",
+                f"Hours are distributed across the week in {req.session_minutes}-minute sessions.",
+            ] + _unused_time_notes(allocator) + _availability_notes(short_days, unmet_days) + scored.notes,
+            scorer=scorer.name,
+            scoring_ms=round(timer.elapsed_ms, 3),
+        )
+    return resp
+
+
+def _replay_day(
+    daily: DailyAllocation,
+    course_hours: Dict[str, float],
+    cursors: Mapping[str, TopicCursor],
+    session_minutes: int,
+) -> Dict[str, float]:
+    # Account for a kept day without re-planning it; returns its hours per course.
+    # Sessions give exact hours, allocations only rounded ones
+    hours: Dict[str, float] = {}
+    if daily.sessions:
+        for session in daily.sessions:
+            hours[session.course] = hours.get(session.course, 0.0) + session_minutes / 60
+    else:
+        hours = {alloc.course: alloc.hours for alloc in daily.allocations}
+    for course_name, h in hours.items():
+        course_hours[course_name] = course_hours.get(course_name, 0.0) + h
+    for session in daily.sessions:
+        if session.course in cursors:
+            cursors[session.course].next(session_minutes)
+    return hours
+
+
+def _plan_day(
+    req: GenerateRequest,
+    allocator: DailyAllocator,
+    priorities: Dict[str, float],
+    slots: FreeSlots,
+    day: str,
+    short_days: List[str],
+    unmet_days: List[str],
+    cursors: Mapping[str, TopicCursor],
+) -> Tuple[Dict[str, float], List[Session]]:
+    # The day's budget shrinks to what fits the availability windows, so every
+    # allocated hour gets a session; days too short for the per-course
+    # minimums are split by priority and listed in `unmet_days`
+    fits = slots.capacity(req.session_minutes, req.break_minutes)
+    if fits < allocator.units and day not in short_days:
+        short_days.append(day)
+    hours_by_course = allocator.allocate(priorities, sessions=fits)
+    if not allocator.minimums_met and day not in unmet_days:
+        unmet_days.append(day)
+    sessions, _ = plan_sessions(hours_by_course, slots, req.session_minutes, req.break_minutes, cursors)
+    return hours_by_course, sessions
+
+
+def _topic_cursors(courses: Sequence[Course]) -> Dict[str, TopicCursor]:
+    # Sessions of a course with a syllabus work through it in prerequisite order
+    cursors: Dict[str, TopicCursor] = {}
+    for course in courses:
+        if course.topics:
+            graph = topic_graph(syllabus_key(course.topics))
+            cursors[course.name] = TopicCursor(
+                [graph.names[i] for i in graph.order],
+                [course.topics[i].est_hours for i in graph.order],
+            )
+    return cursors
+
 
-    total_weight = sum(weights.values()) or 1.0
+def _availability_notes(short_days: List[str], unmet_days: List[str]) -> List[str]:
+    notes = []
+    if short_days:
+        notes.append(f"Availability windows limit study time on {', '.join(short_days)}.")
+    if unmet_days:
+        notes.append(
+            f"Minimum hours per course are skipped on {', '.join(unmet_days)}: "
+            "the availability windows hold fewer sessions than the minimums need."
+        )
+    return notes
 
-    # Step 2: Calculate weekly total hours
-    weekly_hours = float(req.avg_hours_per_day) * len(days)
 
-    # Step 3: Hours per course per week
-    course_hours: Dict[str, float] = {}
-    for course_name, w in weights.items():
-        course_hours[course_name] = (w / total_weight) * weekly_hours
+def _unused_time_notes(allocator: DailyAllocator) -> List[str]:
+    if allocator.unused_minutes < 1:
+        return []
+    return [f"{allocator.unused_minutes:.0f} minutes per day are left free because they don't fill a whole session."]
+
+
+class CourseState:
+    """
+    Running state of one course in a calendar plan.
+    Each day's topic fact is derived from this state, which is then advanced
+    by the hours studied that day.
+    """
+
+    def __init__(self, course: Course, weight: float, exam_date: dt.date, start: dt.date) -> None:
+        self.name = course.name
+        self.weight = weight
+        self.exam_date = exam_date
+        self.days_to_exam = (exam_date - start).days
+        self.mastery, self.difficulty, self.importance = course_attributes(course)
+        # A syllabus states its own hours; otherwise they follow from the weight
+        if course.topics:
+            self.needed_hours = sum(topic.est_hours for topic in course.topics)
+            graph = topic_graph(syllabus_key(course.topics))
+            self.syllabus = {"prereq_depth": graph.max_depth, "dependents": graph.max_dependents}
+        else:
+            self.needed_hours = HOURS_PER_WEIGHT * weight
+            self.syllabus = {}
+        self.studied = 0.0
+
+    def fact(self) -> Dict[str, Any]:
+        # The score cache keys on rule buckets, so days share an entry until a
+        # value crosses a rule boundary
+        return {
+            "course_id": self.name,
+            "topic_id": self.name,
+            "days_to_exam": self.days_to_exam,
+            "mastery": self.mastery,
+            "difficulty": self.difficulty,
+            "importance": self.importance,
+            "est_hours": max(0.0, self.needed_hours - self.studied),
+            **self.syllabus,
+        }
+
+    def advance(self, hours: float) -> None:
+        """Apply one day of study and move one day closer to the exam."""
+        self.studied += hours
+        gained = hours / self.needed_hours if self.needed_hours else 0.0
+        self.mastery = min(0.95, self.mastery + (1.0 - self.mastery) * gained)
+        self.days_to_exam -= 1
+
+
+def generate_calendar(
+    req: GenerateRequest,
+    weights: Optional[Dict[str, float]] = None,
+    keep: Sequence[DailyAllocation] = (),
+) -> GenerateResponse:
+    """
+    Generate a dated, day-by-day plan from `start_date` up to the last exam.
+    Each day the courses whose exam hasn't passed share `avg_hours_per_day` in
+    proportion to weight x urgency_factor x (1 + rule boosts). Every day is
+    computed from the previous day's course state only, and with a rule
+    scorer a course's fact is answered by the score cache until one of its
+    values crosses a rule boundary, so long horizons stay cheap. Notes explain the rules fired on the first day.
+    Courses without an exam date are planned up to the last exam. Days in
+    `keep` only advance the course state; they are not scored again.
+    """
+    if weights is None:
+        with METRICS.stage("weights"):
+            weights = course_weights(req.courses)
+
+    start = req.start_date or dt.date.today()
+    last_exam = max(course.exam_date for course in req.courses if course.exam_date)
+    if last_exam < start:
+        raise ValueError("All exam dates are before the start date.")
+    if (last_exam - start).days >= MAX_PLAN_DAYS:
+        raise ValueError(f"Plans are limited to {MAX_PLAN_DAYS} days.")
+
+    states = [
+        CourseState(course, weights[course.name], course.exam_date or last_exam, start)
+        for course in req.courses
+    ]
+    # Calendar plans need the daily rule boosts; the simple formula has none,
+    # so it falls back to the compiled engine for them
+    scorer = get_scorer(req.scorer)
+    if not scorer.uses_rules:
+        scorer = SCORERS["compiled"]
+    timer = Timer()
+    first_day_notes: List[str] = []
+    allocator = DailyAllocator(req.avg_hours_per_day, req.courses, req.session_minutes)
+    windows = windows_by_day(req.availability)
+    short_days: List[str] = []
+    unmet_days: List[str] = []
+    cursors = _topic_cursors(req.courses)
 
-    # Step 4: Build daily allocations (spread evenly across days)
     schedule: List[DailyAllocation] = []
-    for day in days:
-        allocations = []
-        for course_name, hours in course_hours.items():
-            per_day = max(1.0, hours / len(days))
-            allocations.append({
-                "course": course_name,
-                "hours": round(per_day, 2)
-            })
-        schedule.append(DailyAllocation(day=day, allocations=allocations))
-
-    return GenerateResponse(
-        student_name=req.student_name,
-        academic_level=req.academic_level,
-        semester=req.semester,
-        total_weekly_hours=round(weekly_hours, 2),
-        per_course_hours={k: round(v, 2) for k, v in course_hours.items()},
-        schedule=schedule,
-        notes=[
-            "Lower confidence and higher credit-unit courses are allocated more study time.",
-            "Hours are distributed evenly across the week."
-        ]
-    )
+    course_hours: Dict[str, float] = {state.name: 0.0 for state in states}
+    with METRICS.stage("plan"):
+        day = start
+        while day <= last_exam:
+            active = [state for state in states if state.days_to_exam >= 0]
+            index = (day - start).days
+            if index < len(keep):
+                kept = _replay_day(keep[index], course_hours, cursors, req.session_minutes)
+                for state in active:
+                    state.advance(kept.get(state.name, 0.0))
+                schedule.append(keep[index])
+                day += dt.timedelta(days=1)
+                continue
+            with timer:
+                scores = scorer.adjustments([state.fact() for state in active], req.cram_mode)
+            if index == len(keep):
+                first_day_notes = explain(scores)
+            priority: Dict[str, float] = {}
+            for state in active:
+                boost = sum(adjustment[1] for adjustment in scores[state.name])
+                urgency = urgency_factor(state.days_to_exam, req.cram_mode)
+                priority[state.name] = max(0.0, state.weight * urgency * (1.0 + boost))
+            day_name = DAY_NAMES[day.weekday()]
+            hours_by_course, sessions = _plan_day(req, allocator, priority, FreeSlots(windows[day_name]), day_name, short_days, unmet_days, cursors)
+
+            allocations = []
+            for state in active:
+                hours = hours_by_course[state.name]
+                state.advance(hours)
+                course_hours[state.name] += hours
+                if hours > 0:
+                    allocations.append({"course": state.name, "hours": round(hours, 2)})
+            schedule.append(DailyAllocation(day=day_name, date=day, allocations=allocations, sessions=sessions))
+            day += dt.timedelta(days=1)
+    if timer.elapsed_ms:
+        METRICS.observe("rules", timer.elapsed_ms / 1000)
+
+    with METRICS.stage("response"):
+        resp = GenerateResponse(
+            student_name=req.student_name,
+            academic_level=req.academic_level,
+            semester=req.semester,
+            total_weekly_hours=round(allocator.units * allocator.session_minutes / 60 * len(DAY_NAMES), 2),
+            per_course_hours={k: round(v, 2) for k, v in course_hours.items()},
+            schedule=schedule,
+            notes=[
+                "Lower confidence and higher credit-unit courses are allocated more study time.",
+                "Courses get more time as their exam approaches; each course is studied up to its exam day.",
+                f"Daily hours are handed out in {req.session_minutes}-minute sessions.",
+            ] + _unused_time_notes(allocator) + _availability_notes(short_days, unmet_days) + first_day_notes,
+            scorer=scorer.name,
+            scoring_ms=round(timer.elapsed_ms, 3),
+        )
+    return resp
+
+
+def replan(
+    resp: GenerateResponse,
+    plan: StoredPlan,
+    patch: SchedulePatch,
+) -> Tuple[GenerateResponse, StoredPlan, List[DayChange]]:
+    """
+    Re-plan a stored schedule after `patch`.
+    Only the base weights of added or changed courses are recomputed, and the
+    first `days_completed` days are kept as planned; the remaining days are
+    re-planned from the state those days leave behind. Rounding remainders
+    restart after the kept days, so a later day may move by one session even
+    when nothing else changed.
+    Returns the new schedule, what it was made from, and the days that differ from `resp`.
+    """
+    courses = {course.name: course for course in plan.request.courses}
+    weights = dict(plan.weights)
+    unknown = [name for name in patch.remove_courses if name not in courses]
+    if unknown:
+        raise ValueError(f"Unknown course(s): {', '.join(unknown)}")
+    for name in patch.remove_courses:
+        del courses[name]
+        weights.pop(name, None)
+    changed: List[Course] = []
+    for changes in patch.courses:
+        name = changes.get("name")
+        if not name:
+            raise ValueError("Each changed course needs a name.")
+        courses[name] = courses[name].updated(changes) if name in courses else Course.model_validate(changes)
+        changed.append(courses[name])
+    weights.update(course_weights(changed))
+    if not courses:
+        raise ValueError("A schedule needs at least one course.")
+
+    update: Dict[str, Any] = {"courses": list(courses.values())}
+    if patch.avg_hours_per_day is not None:
+        update["avg_hours_per_day"] = patch.avg_hours_per_day
+    was_calendar = bool(resp.schedule and resp.schedule[0].date)
+    is_calendar = any(course.exam_date for course in courses.values())
+    if was_calendar:
+        # Keep the plan anchored to its original first day
+        update["start_date"] = resp.schedule[0].date
+    req = plan.request.model_copy(update=update)
+
+    # Kept days only make sense while the plan stays weekly or stays dated
+    keep = resp.schedule[:patch.days_completed] if was_calendar == is_calendar else []
+    new_resp = generate_schedule(req, weights=weights, keep=keep)
+    changed_days = [
+        DayChange(index=index, day=day)
+        for index, day in enumerate(new_resp.schedule)
+        if index >= len(resp.schedule) or day != resp.schedule[index]
+    ]
+    return new_resp, StoredPlan(request=req, weights=weights), changed_days
+
+
+def generate_payload(req: GenerateRequest) -> Dict[str, Any]:
+    """
+    `generate_schedule` as plain dicts and lists (dates and times left as
+    objects). Sent back from a worker process this pickles several times faster
+    than the model, and `serialization.dumps` writes it without another pass
+    through pydantic.
+    """
+    return generate_schedule(req).model_dump()
+
+
+BatchResult = Tuple[int, Optional[Dict[str, Any]], Optional[Dict[str, float]], Optional[str]]
+
+
+def generate_batch(items: Sequence[Tuple[int, GenerateRequest]]) -> List[BatchResult]:
+    """
+    Generate schedules for (index, request) pairs.
+    Requests with identical course lists share one weight computation.
+    Returns (index, response as JSON-ready dict, base course weights, error)
+    per item, the weights being what the caller stores for re-planning;
+    failures don't affect other items.
+    """
+    shared: Dict[Hashable, Dict[str, float]] = {}
+    results: List[BatchResult] = []
+    for index, req in items:
+        try:
+            key = courses_signature(req.courses)
+            if key not in shared:
+                shared[key] = course_weights(req.courses)
+            resp = generate_schedule(req, weights=shared[key])
+            results.append((index, resp.model_dump(mode="json"), shared[key], None))
+        except Exception as exc:
+            results.append((index, None, None, f"Schedule generation failed: {exc}"))
+    return results
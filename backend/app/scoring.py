@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import datetime as dt
+import threading
+import time
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from .config import SCORER
+from .models import Course, GenerateRequest
+from .rule_table import RULE_TABLE, SCORE_CACHE, Adjustment, CompiledStudyEngine, count_fires
+from .syllabus import syllabus_key, topic_graph
+
+# Experta fires rules in no fixed order; notes list them in table order
+_RULE_ORDER = {spec.rule_id: pos for pos, spec in enumerate(RULE_TABLE)}
+
+
+def course_attributes(course: Course) -> Tuple[float, float, float]:
+    """
+    (mastery, difficulty, importance) of a course for the rule engine.
+    Confidence 1-5 maps to mastery 0.0-0.8 and difficulty 1.0-0.0; each credit
+    unit above one adds 0.15 importance.
+    """
+    confidence = int(course.confidence_level)
+    return 0.2 * (confidence - 1), (5 - confidence) / 4, 1.0 + 0.15 * (int(course.credit_unit) - 1)
+
+
+def course_fact(course: Course, est_hours: float, today: Optional[dt.date] = None) -> Dict[str, Any]:
+    """
+    Topic fact describing a whole course; days_to_exam is only set when the
+    course has an exam date, the prerequisite fields only when it has topics.
+    """
+    mastery, difficulty, importance = course_attributes(course)
+    fact: Dict[str, Any] = {
+        "course_id": course.name,
+        "topic_id": course.name,
+        "mastery": round(mastery, 2),
+        "difficulty": round(difficulty, 2),
+        "importance": round(importance, 2),
+        "est_hours": round(est_hours, 1),
+    }
+    if course.exam_date:
+        fact["days_to_exam"] = (course.exam_date - (today or dt.date.today())).days
+    if course.topics:
+        graph = topic_graph(syllabus_key(course.topics))
+        fact["prereq_depth"] = graph.max_depth
+        fact["dependents"] = graph.max_dependents
+    return fact
+
+
+def topic_facts(course: Course, today: Optional[dt.date] = None) -> List[Dict[str, Any]]:
+    """One fact per syllabus topic, with its depth in the prerequisite DAG."""
+    graph = topic_graph(syllabus_key(course.topics))
+    mastery, difficulty, importance = course_attributes(course)
+    facts = []
+    for i, topic in enumerate(course.topics):
+        fact: Dict[str, Any] = {
+            "course_id": course.name,
+            "topic_id": f"{course.name}/{topic.name}",
+            "mastery": round(mastery, 2),
+            "difficulty": round(difficulty if topic.difficulty is None else topic.difficulty, 2),
+            "importance": round(importance, 2),
+            "est_hours": round(topic.est_hours, 1),
+            "prereqs": list(topic.prereqs),
+            "prereq_depth": graph.depth[i],
+            "dependents": graph.dependents[i],
+        }
+        if course.exam_date:
+            fact["days_to_exam"] = (course.exam_date - (today or dt.date.today())).days
+        facts.append(fact)
+    return facts
+
+
+class Scored(NamedTuple):
+    weights: Dict[str, float]
+    notes: List[str]  # one line per course that fired rules
+
+
+def _reasons(fired: Sequence[Adjustment], counts: Optional[Mapping[str, int]] = None, total: int = 0) -> str:
+    reasons = []
+    for rule_id, boost, text in sorted(set(fired), key=lambda adjustment: _RULE_ORDER.get(adjustment[0], len(_RULE_ORDER))):
+        share = f", {counts[rule_id]} of {total} topics" if counts else ""
+        reasons.append(f"{rule_id}: {text} (boost {boost:+.2f}{share})")
+    return "; ".join(reasons)
+
+
+def explain(adjustments: Mapping[str, Sequence[Adjustment]]) -> List[str]:
+    """Format fired rules as one note per course."""
+    return [f"{course} – {_reasons(fired)}" for course, fired in adjustments.items() if fired]
+
+
+def explain_topics(course: str, fired_per_topic: Sequence[Sequence[Adjustment]]) -> List[str]:
+    """One note for a course scored topic by topic, counting the topics each rule fired for."""
+    counts: Dict[str, int] = {}
+    for fired in fired_per_topic:
+        for rule_id, _, _ in fired:
+            counts[rule_id] = counts.get(rule_id, 0) + 1
+    fired_all = [adjustment for fired in fired_per_topic for adjustment in fired]
+    if not fired_all:
+        return []
+    return [f"{course} – {_reasons(fired_all, counts, len(fired_per_topic))}"]
+
+
+class Scorer:
+    """
+    Turns a request's courses into study weights.
+    Rule-based scorers multiply the base weight of each course by
+    (1 + the boosts of the rules its fact fires).
+    """
+
+    name = "base"
+    uses_rules = False
+
+    def adjustments(self, facts: Sequence[Mapping[str, Any]], cram_mode: bool) -> Dict[str, List[Adjustment]]:
+        """Rules fired per fact, keyed by topic_id."""
+        return {fact["topic_id"]: [] for fact in facts}
+
+    def score(self, req: GenerateRequest, weights: Mapping[str, float], est_hours: Mapping[str, float]) -> Scored:
+        """
+        Courses with topics are scored topic by topic; their boost is the
+        mean of the topic boosts weighted by each topic's hours.
+        """
+        if not self.uses_rules:
+            return Scored(dict(weights), [])
+        start = req.start_date or dt.date.today()
+        facts: List[Dict[str, Any]] = []
+        for course in req.courses:
+            facts.extend(topic_facts(course, start) if course.topics else [course_fact(course, est_hours[course.name], start)])
+        fired = self.adjustments(facts, req.cram_mode)
+
+        boosted: Dict[str, float] = {}
+        notes: List[str] = []
+        for course in req.courses:
+            if course.topics:
+                ids = [f"{course.name}/{topic.name}" for topic in course.topics]
+                hours = [topic.est_hours for topic in course.topics]
+                boosts = [sum(b for _, b, _ in fired.get(topic_id, ())) for topic_id in ids]
+                boost = sum(b * h for b, h in zip(boosts, hours)) / sum(hours)
+                notes += explain_topics(course.name, [fired.get(topic_id, []) for topic_id in ids])
+            else:
+                boost = sum(b for _, b, _ in fired.get(course.name, ()))
+                notes += explain({course.name: fired.get(course.name, [])})
+            boosted[course.name] = max(0.0, weights[course.name] * (1.0 + boost))
+        return Scored(boosted, notes)
+
+
+class SimpleScorer(Scorer):
+    """Confidence and credit-unit formula only (`scheduler.course_weights`)."""
+
+    name = "simple"
+
+
+class ExpertaScorer(Scorer):
+    """Experta StudyEngine borrowed from the engine pool; no caching, so timings show its real cost."""
+
+    name = "experta"
+    uses_rules = True
+
+    def adjustments(self, facts: Sequence[Mapping[str, Any]], cram_mode: bool) -> Dict[str, List[Adjustment]]:
+        # Imported on first use: importing rules loads Experta and builds the
+        # engine pool, which processes using other scorers never need
+        from .rules import ENGINE_POOL
+
+        with ENGINE_POOL.checkout(cram_mode) as engine:
+            return engine.score_topics(facts)
+
+
+class CompiledScorer(Scorer):
+    """Table-driven engine behind the shared score cache."""
+
+    name = "compiled"
+    uses_rules = True
+
+    def adjustments(self, facts: Sequence[Mapping[str, Any]], cram_mode: bool) -> Dict[str, List[Adjustment]]:
+        return SCORE_CACHE.score_topics(CompiledStudyEngine(cram_mode), facts)
+
+
+class VectorizedScorer(Scorer):
+    """All facts of a request scored at once as NumPy columns (`vectorized.score_cohort`); no cache."""
+
+    name = "vectorized"
+    uses_rules = True
+
+    def adjustments(self, facts: Sequence[Mapping[str, Any]], cram_mode: bool) -> Dict[str, List[Adjustment]]:
+        if not facts:
+            return {}
+        # Imported on first use, like Experta above: it loads NumPy
+        from .vectorized import columns_from_topics, score_cohort
+
+        fired = score_cohort(columns_from_topics(facts), cram_mode, explain=True).adjustments or []
+        count_fires(fired, self.name)
+        return {fact["topic_id"]: adjustments for fact, adjustments in zip(facts, fired)}
+
+
+SCORERS: Dict[str, Scorer] = {
+    scorer.name: scorer for scorer in (SimpleScorer(), ExpertaScorer(), CompiledScorer(), VectorizedScorer())
+}
+
+
+def get_scorer(name: Optional[str] = None) -> Scorer:
+    """Scorer by name; falls back to the STUDY_SCORER default."""
+    name = name or SCORER
+    try:
+        return SCORERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown scorer {name!r}; expected one of {', '.join(SCORERS)}") from None
+
+
+class ScorerStats:
+    """Call counts and time spent per scorer, in milliseconds."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: dict(stats, mean_ms=stats["total_ms"] / stats["calls"])
+                for name, stats in self._stats.items()
+            }
+
+
+SCORER_STATS = ScorerStats()
+
+
+class Timer:
+    """Accumulates wall time over several `with` blocks."""
+
+    def __init__(self) -> None:
+        self.elapsed_ms = 0.0
+
+    def __enter__(self) -> "Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.elapsed_ms += (time.perf_counter() - self._start) * 1000
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from .config import STORE_MAX_ENTRIES, STORE_PATH, STORE_TTL_SECONDS
+from .models import GenerateResponse, StoredPlan
+from .serialization import dumps
+
+# Schedule plus what it was generated from (None for entries stored without it)
+Entry = Tuple[GenerateResponse, Optional[StoredPlan]]
+
+
+class ScheduleStore(ABC):
+    """
+    Generated schedules keyed by schedule id.
+    Entries expire after `ttl` seconds; the oldest are dropped beyond `maxsize`.
+    """
+
+    def __init__(self, ttl: int = STORE_TTL_SECONDS, maxsize: int = STORE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.maxsize = max(1, maxsize)
+
+    def add(self, resp: GenerateResponse, plan: Optional[StoredPlan] = None) -> str:
+        """Store a schedule under a fresh id and return the id."""
+        schedule_id = uuid.uuid4().hex
+        self.put(schedule_id, resp.model_copy(update={"schedule_id": schedule_id}), plan)
+        return schedule_id
+
+    def add_payload(self, payload: Dict[str, Any], plan: Optional[StoredPlan] = None) -> str:
+        """
+        Like `add`, for a response still in plain form (see `generate_payload`).
+        Sets payload["schedule_id"] and returns the id.
+        """
+        schedule_id = uuid.uuid4().hex
+        payload["schedule_id"] = schedule_id
+        self.put_payload(schedule_id, payload, plan)
+        return schedule_id
+
+    @abstractmethod
+    def put(self, schedule_id: str, resp: GenerateResponse, plan: Optional[StoredPlan] = None) -> None:
+        """Store a schedule under `schedule_id`, replacing any entry already there."""
+
+    def put_payload(self, schedule_id: str, payload: Dict[str, Any], plan: Optional[StoredPlan] = None) -> None:
+        self.put(schedule_id, GenerateResponse.model_validate(payload), plan)
+
+    @abstractmethod
+    def get_entry(self, schedule_id: str) -> Optional[Entry]:
+        """The schedule and its plan, or None if it is unknown or expired."""
+
+    def get(self, schedule_id: str) -> Optional[GenerateResponse]:
+        entry = self.get_entry(schedule_id)
+        return entry[0] if entry else None
+
+    def __contains__(self, schedule_id: str) -> bool:
+        return self.get_entry(schedule_id) is not None
+
+
+class MemoryScheduleStore(ScheduleStore):
+    """
+    In-process store with TTL and LRU eviction.
+    Plain payloads are kept as they are and validated on first read.
+    """
+
+    def __init__(self, ttl: int = STORE_TTL_SECONDS, maxsize: int = STORE_MAX_ENTRIES):
+        super().__init__(ttl, maxsize)
+        self._data: "OrderedDict[str, Tuple[float, Tuple[Union[GenerateResponse, Dict[str, Any]], Optional[StoredPlan]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, schedule_id: str, resp: GenerateResponse, plan: Optional[StoredPlan] = None) -> None:
+        self._put(schedule_id, resp, plan)
+
+    def put_payload(self, schedule_id: str, payload: Dict[str, Any], plan: Optional[StoredPlan] = None) -> None:
+        self._put(schedule_id, payload, plan)
+
+    def _put(self, schedule_id: str, resp: Union[GenerateResponse, Dict[str, Any]], plan: Optional[StoredPlan]) -> None:
+        with self._lock:
+            self._data[schedule_id] = (time.monotonic() + self.ttl, (resp, plan))
+            self._data.move_to_end(schedule_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_entry(self, schedule_id: str) -> Optional[Entry]:
+        with self._lock:
+            item = self._data.get(schedule_id)
+            if item is None:
+                return None
+            expires, (resp, plan) = item
+            if expires < time.monotonic():
+                del self._data[schedule_id]
+                return None
+            if isinstance(resp, dict):
+                resp = GenerateResponse.model_validate(resp)
+                self._data[schedule_id] = (expires, (resp, plan))
+            self._data.move_to_end(schedule_id)
+            return resp, plan
+
+
+class SqliteScheduleStore(ScheduleStore):
+    """
+    On-disk store shared by every process pointing at the same file.
+    Schedules are kept as JSON; a connection is opened per call so the store is
+    safe to use from any thread.
+    """
+
+    def __init__(self, path: str, ttl: int = STORE_TTL_SECONDS, maxsize: int = STORE_MAX_ENTRIES):
+        super().__init__(ttl, maxsize)
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS schedules ("
+                " id TEXT PRIMARY KEY, expires REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS schedules_expires ON schedules (expires)")
+            # Files created before re-planning lack the plan column
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(schedules)")}
+            if "plan" not in columns:
+                conn.execute("ALTER TABLE schedules ADD COLUMN plan TEXT")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def put(self, schedule_id: str, resp: GenerateResponse, plan: Optional[StoredPlan] = None) -> None:
+        self._insert(schedule_id, resp.model_dump_json(), plan)
+
+    def _insert(self, schedule_id: str, payload: str, plan: Optional[StoredPlan]) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO schedules (id, expires, payload, plan) VALUES (?, ?, ?, ?)",
+                (schedule_id, now + self.ttl, payload, plan.model_dump_json() if plan else None),
+            )
+            conn.execute("DELETE FROM schedules WHERE expires < ?", (now,))
+            conn.execute(
+                "DELETE FROM schedules WHERE id IN ("
+                " SELECT id FROM schedules ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def put_payload(self, schedule_id: str, payload: Dict[str, Any], plan: Optional[StoredPlan] = None) -> None:
+        self._insert(schedule_id, dumps(payload).decode("utf-8"), plan)
+
+    def get_entry(self, schedule_id: str) -> Optional[Entry]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, plan FROM schedules WHERE id = ? AND expires >= ?",
+                (schedule_id, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        plan = StoredPlan.model_validate_json(row[1]) if row[1] else None
+        return GenerateResponse.model_validate_json(row[0]), plan
+
+    def __contains__(self, schedule_id: str) -> bool:
+        # Without loading the payload
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM schedules WHERE id = ? AND expires >= ?", (schedule_id, time.time())
+            ).fetchone()
+        return row is not None
+
+
+def make_store() -> ScheduleStore:
+    """Store selected by configuration: SQLite when STUDY_STORE_PATH is set, memory otherwise."""
+    if STORE_PATH:
+        return SqliteScheduleStore(STORE_PATH)
+    return MemoryScheduleStore()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Course syllabi whose prerequisite graph is kept
+TOPIC_GRAPH_CACHE_SIZE = 256
+
+# (topic name, prerequisite names) per topic, as given
+SyllabusKey = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+class TopicGraph(NamedTuple):
+    """
+    Prerequisite DAG of one course's topics.
+    Lists are indexed like the input topics; `order` is a topological order.
+    """
+    names: Tuple[str, ...]
+    order: Tuple[int, ...]
+    depth: Tuple[int, ...]       # longest chain of prerequisites below each topic
+    dependents: Tuple[int, ...]  # topics listing it as a direct prerequisite
+
+    @property
+    def max_depth(self) -> int:
+        return max(self.depth, default=0)
+
+    @property
+    def max_dependents(self) -> int:
+        return max(self.dependents, default=0)
+
+
+def syllabus_key(topics: Sequence[object]) -> SyllabusKey:
+    """Hashable form of a topic list (objects with `name` and `prereqs`)."""
+    return tuple((topic.name, tuple(topic.prereqs)) for topic in topics)  # type: ignore[attr-defined]
+
+
+@lru_cache(maxsize=TOPIC_GRAPH_CACHE_SIZE)
+def topic_graph(key: SyllabusKey) -> TopicGraph:
+    """
+    Validate a syllabus and order it with Kahn's algorithm in O(topics + prerequisites).
+    Ready topics are taken in input order, so the result is deterministic.
+    Depth is filled in the same pass: a topic's depth is one more than its
+    deepest prerequisite. Raises ValueError for duplicate names, unknown
+    prerequisites and cycles.
+    """
+    index: Dict[str, int] = {}
+    for i, (name, _) in enumerate(key):
+        if name in index:
+            raise ValueError(f"Duplicate topic {name!r}")
+        index[name] = i
+
+    unlocks: List[List[int]] = [[] for _ in key]
+    waiting = [0] * len(key)
+    for i, (name, prereqs) in enumerate(key):
+        for prereq in set(prereqs):
+            if prereq not in index:
+                raise ValueError(f"Topic {name!r} has unknown prerequisite {prereq!r}")
+            unlocks[index[prereq]].append(i)
+            waiting[i] += 1
+
+    depth = [0] * len(key)
+    order: List[int] = []
+    ready = deque(i for i, count in enumerate(waiting) if count == 0)
+    while ready:
+        i = ready.popleft()
+        order.append(i)
+        for j in unlocks[i]:
+            depth[j] = max(depth[j], depth[i] + 1)
+            waiting[j] -= 1
+            if not waiting[j]:
+                ready.append(j)
+
+    if len(order) < len(key):
+        stuck = sorted(key[i][0] for i, count in enumerate(waiting) if count)
+        shown = ", ".join(stuck[:10]) + (", ..." if len(stuck) > 10 else "")
+        raise ValueError(f"Prerequisite cycle among topics: {shown}")
+
+    return TopicGraph(
+        names=tuple(name for name, _ in key),
+        order=tuple(order),
+        depth=tuple(depth),
+        dependents=tuple(len(targets) for targets in unlocks),
+    )
+
+
+class TopicCursor:
+    """
+    Walks a course's topics in prerequisite order across the plan, naming the
+    topic each study session covers. Once every topic had its hours, sessions
+    are left without a topic (review time).
+    """
+
+    def __init__(self, names: Sequence[str], hours: Sequence[float]) -> None:
+        self.names = list(names)
+        self.remaining = [h * 60 for h in hours]
+        self.pos = 0
+
+    def next(self, minutes: int) -> Optional[str]:
+        if self.pos >= len(self.names):
+            return None
+        name = self.names[self.pos]
+        self.remaining[self.pos] -= minutes
+        if self.remaining[self.pos] <= 1e-9:
+            self.pos += 1
+        return name
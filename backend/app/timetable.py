@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import datetime as dt
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, get_args
+
+from .models import AvailabilityWindow, Session, Weekday
+from .syllabus import TopicCursor
+
+DAY_NAMES: List[str] = list(get_args(Weekday))
+
+# Used when a request has no availability windows
+DEFAULT_WINDOW = (8 * 60, 22 * 60)
+
+# Half-open [start, end) span in minutes after midnight
+Interval = Tuple[int, int]
+
+
+def to_minutes(t: dt.time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def to_time(minutes: int) -> dt.time:
+    # Midnight at the end of the day is 00:00, as in AvailabilityWindow.end
+    if not 0 <= minutes <= 24 * 60:
+        raise ValueError(f"{minutes} minutes is outside the day")
+    return dt.time(minutes // 60 % 24, minutes % 60)
+
+
+def windows_by_day(availability: Sequence[AvailabilityWindow]) -> Dict[str, List[Interval]]:
+    """Availability windows (in minutes) per weekday name; a window without days applies to every day."""
+    windows: Dict[str, List[Interval]] = {day: [] for day in DAY_NAMES}
+    for window in availability:
+        span = (to_minutes(window.start), to_minutes(window.end) if window.end != dt.time(0) else 24 * 60)
+        for day in window.days or DAY_NAMES:
+            windows[day].append(span)
+    if not availability:
+        for day in DAY_NAMES:
+            windows[day].append(DEFAULT_WINDOW)
+    return windows
+
+
+class FreeSlots:
+    """
+    Free time of one day as sorted, disjoint [start, end) intervals.
+    Starts and ends live in two parallel sorted lists, so finding the slot
+    around a time or reserving a span is a bisect plus a list splice.
+    """
+
+    def __init__(self, windows: Iterable[Interval] = ()) -> None:
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        for start, end in sorted(windows):
+            if end <= start:
+                continue
+            if self.ends and start <= self.ends[-1]:
+                # Overlapping or touching windows merge into one slot
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __iter__(self):
+        return iter(zip(self.starts, self.ends))
+
+    def capacity(self, length: int, gap: int) -> int:
+        """
+        How many sessions of `length` minutes fit, `gap` minutes apart. Like
+        `plan_sessions`, the gap after a slot's last session carries into the
+        next slot, so slots closer together than `gap` hold fewer sessions.
+        """
+        count = cursor = 0
+        for start, end in self:
+            begin = max(start, cursor)
+            fits = max(0, (end - begin + gap) // (length + gap))
+            if fits:
+                count += fits
+                cursor = begin + fits * (length + gap)
+        return count
+
+    def first_fit(self, length: int, earliest: int = 0) -> Optional[int]:
+        """Earliest start >= `earliest` of a free span of `length` minutes."""
+        i = max(0, bisect_right(self.starts, earliest) - 1)
+        for start, end in zip(self.starts[i:], self.ends[i:]):
+            begin = max(start, earliest)
+            if end - begin >= length:
+                return begin
+        return None
+
+    def reserve(self, start: int, end: int) -> None:
+        """Remove [start, end) from the free time; the span may run past the end of its slot."""
+        i = bisect_right(self.starts, start) - 1
+        if i < 0 or start >= self.ends[i]:
+            raise ValueError("Span does not start in free time")
+        slot_start, slot_end = self.starts[i], self.ends[i]
+        del self.starts[i], self.ends[i]
+        if end < slot_end:
+            self.starts.insert(i, end)
+            self.ends.insert(i, slot_end)
+        if slot_start < start:
+            self.starts.insert(i, slot_start)
+            self.ends.insert(i, start)
+
+
+def plan_sessions(
+    hours_by_course: Mapping[str, float],
+    slots: FreeSlots,
+    session_minutes: int,
+    break_minutes: int,
+    cursors: Optional[Mapping[str, TopicCursor]] = None,
+) -> Tuple[List[Session], Dict[str, int]]:
+    """
+    Turn a day's hours per course into timed sessions placed first-fit in `slots`,
+    each followed by at least `break_minutes` of rest. Courses take turns, the one
+    with the most sessions left going first (ties by name), so a course's sessions
+    are spread over the day rather than stacked back to back. With a
+    `TopicCursor` for a course, its sessions are labelled with the next topics
+    of its syllabus.
+    Returns the sessions and, per course, the sessions that didn't fit.
+    """
+    left = {name: int(round(hours * 60 / session_minutes)) for name, hours in hours_by_course.items()}
+    queue: List[Tuple[int, str]] = sorted((-n, name) for name, n in left.items() if n > 0)
+    sessions: List[Session] = []
+    unplaced: Dict[str, int] = {}
+    cursor = 0
+    previous: Optional[str] = None
+    while queue:
+        # Avoid the same course twice in a row when another one is waiting
+        pick = 1 if len(queue) > 1 and queue[0][1] == previous else 0
+        count, name = queue.pop(pick)
+        start = slots.first_fit(session_minutes, cursor)
+        if start is None:
+            unplaced[name] = -count
+            continue
+        end = start + session_minutes
+        slots.reserve(start, min(end + break_minutes, slots.ends[bisect_left(slots.ends, end)]))
+        topic = cursors[name].next(session_minutes) if cursors and name in cursors else None
+        sessions.append(Session(course=name, start=to_time(start), end=to_time(end), topic=topic))
+        cursor, previous = end + break_minutes, name
+        if count + 1 < 0:
+            insort(queue, (count + 1, name))
+    return sessions, unplaced
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from itertools import product
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .rule_table import RULE_TABLE, Adjustment, Range, RuleSpec, _freeze, _is_number, covered_buckets, range_bounds
+
+
+# Mirrors rule_table.urgency_factor: days <= 1, <= 3, <= 7, <= 14, beyond
+URGENCY_BINS = np.array([1, 3, 7, 14])
+URGENCY_LEVELS = {
+    True: np.array([2.0, 1.8, 1.6, 1.3, 1.0]),
+    False: np.array([1.8, 1.5, 1.3, 1.15, 1.0]),
+}
+
+
+def urgency_factors(days_to_exam: Sequence[float], cram_mode: bool) -> np.ndarray:
+    """Vectorized `rules.urgency_factor` over a column of days_to_exam."""
+    days = np.asarray(days_to_exam, dtype=float)
+    return URGENCY_LEVELS[bool(cram_mode)][np.digitize(days, URGENCY_BINS, right=True)]
+
+
+def columns_from_topics(topics: Iterable[Mapping[str, Any]]) -> Dict[str, List[Any]]:
+    """Turn a list of topic facts into one list per field."""
+    columns: Dict[str, List[Any]] = {}
+    rows = list(topics)
+    for field in {f for topic in rows for f in topic}:
+        columns[field] = [topic.get(field) for topic in rows]
+    return columns
+
+
+class CohortScores(NamedTuple):
+    boost: np.ndarray        # summed rule boosts per topic
+    urgency: np.ndarray      # urgency multiplier per topic
+    adjustments: Optional[List[List[Adjustment]]] = None  # per topic, only when explain=True
+
+
+def _is_numeric(values: Iterable[Any]) -> bool:
+    return all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values)
+
+
+def _numeric_column(column: Sequence[Any]) -> np.ndarray:
+    # Missing or non-numeric entries become NaN, which never matches a rule
+    try:
+        return np.asarray(column, dtype=float)
+    except (TypeError, ValueError):
+        return np.array([float(v) if _is_number(v) else np.nan for v in column])
+
+
+class ColumnarRules:
+    """
+    Rule table compiled into NumPy lookup tables.
+    Rules are grouped by the fields they test. Each field value is mapped to a
+    code: for exact-value fields its position among the values the rules expect,
+    for range fields the bucket between the sorted range boundaries (the same
+    buckets `CompiledRules` bisects). A trailing "miss" code catches values no
+    rule expects. Each group keeps a dense boost table indexed by those codes,
+    so a whole cohort is scored with one gather per group.
+    """
+
+    def __init__(self, table: Tuple[RuleSpec, ...] = RULE_TABLE) -> None:
+        self.table = tuple(table)
+
+        expected: Dict[str, List[Any]] = {}
+        for spec in self.table:
+            for field, value in spec.when.items():
+                expected.setdefault(field, []).append(_freeze(value))
+
+        self.ranged: Dict[str, bool] = {}
+        self.numeric: Dict[str, bool] = {}
+        self.keys: Dict[str, Any] = {}
+        self.lookup: Dict[str, Dict[Any, int]] = {}
+        self.size: Dict[str, int] = {}
+        for field, values in expected.items():
+            ranges = [v for v in values if isinstance(v, Range)]
+            if ranges and len(ranges) != len(values):
+                raise ValueError(f"Field {field!r} mixes ranges and exact values")
+            self.ranged[field] = bool(ranges)
+            if ranges:
+                self.keys[field] = np.array(range_bounds(ranges))
+                self.size[field] = len(self.keys[field]) + 1
+                continue
+            seen = set(values)
+            self.numeric[field] = _is_numeric(seen)
+            if self.numeric[field]:
+                self.keys[field] = np.array(sorted(float(v) for v in seen))
+                self.lookup[field] = {v: i for i, v in enumerate(self.keys[field].tolist())}
+            else:
+                self.keys[field] = sorted(seen, key=repr)
+                self.lookup[field] = {v: i for i, v in enumerate(self.keys[field])}
+            self.size[field] = len(self.keys[field])
+
+        grouped: Dict[Tuple[str, ...], List[int]] = {}
+        for pos, spec in enumerate(self.table):
+            grouped.setdefault(tuple(spec.when), []).append(pos)
+
+        # fields -> (boost table, {flat cell: [rule positions]})
+        self.groups: List[Tuple[Tuple[str, ...], np.ndarray, Dict[int, List[int]]]] = []
+        for fields, positions in grouped.items():
+            shape = tuple(self.size[f] + 1 for f in fields)
+            boosts = np.zeros(shape)
+            members: Dict[int, List[int]] = {}
+            for pos in positions:
+                spec = self.table[pos]
+                for cell in product(*(self._cells(f, spec.when[f]) for f in fields)):
+                    boosts[cell] += spec.boost
+                    members.setdefault(int(np.ravel_multi_index(cell, shape)), []).append(pos)
+            self.groups.append((fields, boosts, members))
+
+    def _cells(self, field: str, value: Any) -> Sequence[int]:
+        if self.ranged[field]:
+            return covered_buckets(self.keys[field].tolist(), value)
+        key = float(value) if self.numeric[field] else _freeze(value)
+        return (self.lookup[field][key],)
+
+    def codes(self, field: str, column: Sequence[Any]) -> np.ndarray:
+        """Map a column to lookup codes; values no rule expects get the miss code."""
+        miss = self.size[field]
+        if self.ranged[field]:
+            col = _numeric_column(column)
+            return np.where(np.isnan(col), miss, np.searchsorted(self.keys[field], col, side="right"))
+        if self.numeric[field]:
+            col = _numeric_column(column)
+            idx = np.minimum(np.searchsorted(self.keys[field], col), miss - 1)
+            return np.where(self.keys[field][idx] == col, idx, miss)
+        lookup = self.lookup[field]
+        return np.fromiter((lookup.get(_freeze(v), miss) for v in column), dtype=np.intp, count=len(column))
+
+    def score(self, columns: Mapping[str, Sequence[Any]], explain: bool = False) -> Tuple[np.ndarray, Optional[List[List[Adjustment]]]]:
+        """Summed boosts per row, plus per-row adjustments (table order) when `explain` is set."""
+        n = len(next(iter(columns.values()))) if columns else 0
+        total = np.zeros(n)
+        fired: Optional[List[List[int]]] = [[] for _ in range(n)] if explain else None
+        codes: Dict[str, np.ndarray] = {}
+        for fields, boosts, members in self.groups:
+            if any(f not in columns for f in fields):
+                continue
+            for f in fields:
+                if f not in codes:
+                    codes[f] = self.codes(f, columns[f])
+            cells = np.ravel_multi_index(tuple(codes[f] for f in fields), boosts.shape)
+            total += boosts.ravel()[cells]
+            if fired is not None:
+                for row in np.flatnonzero(np.isin(cells, list(members))):
+                    fired[row].extend(members[int(cells[row])])
+
+        if fired is None:
+            return total, None
+        adjustments = []
+        for positions in fired:
+            adjustments.append([
+                (self.table[p].rule_id, self.table[p].boost, self.table[p].explanation)
+                for p in sorted(positions)
+            ])
+        return total, adjustments
+
+
+COLUMNAR_RULES = ColumnarRules()
+
+
+def score_cohort(
+    columns: Mapping[str, Sequence[Any]],
+    cram_mode: bool,
+    explain: bool = False,
+    rules: Optional[ColumnarRules] = None,
+) -> CohortScores:
+    """
+    Score a whole cohort of topics given as columns (see `columns_from_topics`).
+    Rule attribution is only rebuilt when `explain` is requested.
+    """
+    rules = rules or COLUMNAR_RULES
+    boost, adjustments = rules.score(columns, explain=explain)
+    if "days_to_exam" in columns:
+        urgency = urgency_factors(columns["days_to_exam"], cram_mode)
+    else:
+        urgency = np.ones(len(boost))
+    return CohortScores(boost=boost, urgency=urgency, adjustments=adjustments)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+from .config import SCHEDULER_MAX_PENDING, SCHEDULER_WORKERS
+from .metrics import METRICS, call_captured
+
+T = TypeVar("T")
+
+
+class QueueFull(Exception):
+    """Raised when more jobs are in flight than the pool accepts."""
+
+
+def _mp_context() -> multiprocessing.context.BaseContext:
+    # By now the server runs threads (anyio workers, PDF warm-up); forking a
+    # multi-threaded process can deadlock the child, so workers come from a
+    # fork server that preloads the scheduler instead (spawn where there is none)
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([f"{__package__}.scheduler"])
+    return context
+
+
+class WorkerPool:
+    """
+    Runs CPU-bound functions in a dedicated process pool, off the event loop.
+    At most `max_pending` jobs may be queued or running; further submissions
+    raise QueueFull instead of waiting.
+    """
+
+    def __init__(self, workers: int = SCHEDULER_WORKERS, max_pending: int = SCHEDULER_MAX_PENDING):
+        self.workers = max(0, workers)
+        self.max_pending = max(1, max_pending)
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Optional[Executor]:
+        # workers == 0 falls back to the event loop's default thread pool
+        if self._executor is None and self.workers:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context())
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        if self.pending >= self.max_pending:
+            raise QueueFull()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if not METRICS.enabled:
+                return await loop.run_in_executor(self._get_executor(), partial(fn, *args))
+            # Metrics recorded by the job come back with its result
+            with METRICS.stage("worker"):
+                result, events = await loop.run_in_executor(self._get_executor(), partial(call_captured, fn, *args))
+            METRICS.merge(events)
+            return result
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next request
+            self.shutdown(wait=False)
+            raise
+        finally:
+            self.pending -= 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
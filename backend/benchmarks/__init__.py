@@ -0,0 +1,6 @@
+"""
+Standalone benchmarks for the scheduler, rule engines and exporters.
+
+    python -m backend.benchmarks --output baseline.json
+    python -m backend.benchmarks --compare baseline.json
+"""
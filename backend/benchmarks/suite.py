@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import argparse
+import json
+import pickle
+import platform
+import statistics
+import time
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from ..app.exporters import PDF_BACKENDS, ExportRegistry, allocation_rows
+from ..app.rule_table import SCORE_CACHE, CompiledStudyEngine
+from ..app.rules import StudyEngine
+from ..app.scheduler import generate_payload, generate_schedule
+from ..app.serialization import dumps
+from ..app.store import MemoryScheduleStore
+from ..app.syllabus import topic_graph
+from .workloads import make_facts, make_request
+
+# Relative slowdown over the baseline that counts as a regression
+DEFAULT_THRESHOLD = 0.25
+# Absolute slowdowns below this are treated as noise
+DEFAULT_MIN_DELTA_MS = 0.5
+
+
+class Case(NamedTuple):
+    """
+    One benchmark. `setup` builds fresh input before every timed call so
+    caches filled by one call don't flatter the next.
+    """
+    name: str
+    run: Callable[[Any], Any]
+    setup: Callable[[], Any] = lambda: None
+    quick: bool = True  # part of the --quick subset
+
+
+def _clear_caches() -> None:
+    # Memoized rule scores and topic graphs would otherwise turn every call after
+    # the warm-up into cache hits
+    SCORE_CACHE.clear()
+    topic_graph.cache_clear()
+
+
+def _generate(name: str, req: Any, quick: bool = True) -> Iterator[Case]:
+    # Cold: the engine and syllabus work every time. Warm: what repeated requests see
+    yield Case(f"generate_schedule[{name}]", lambda _: generate_schedule(req), setup=_clear_caches, quick=quick)
+    yield Case(f"generate_schedule[{name},warm]", lambda _: generate_schedule(req), quick=False)
+
+
+def _generate_cases() -> Iterator[Case]:
+    for courses in (1, 20, 200):
+        for scorer in ("simple", "compiled"):
+            yield from _generate(f"weekly,courses={courses},scorer={scorer}", make_request(courses, scorer=scorer))
+    for topics in (10, 500, 5000):
+        for cram in (False, True):
+            yield from _generate(
+                f"weekly,courses=20,topics={topics},cram={int(cram)},scorer=compiled",
+                make_request(20, topics, cram_mode=cram, scorer="compiled"),
+                quick=topics <= 500,
+            )
+    for courses in (1, 20, 200):
+        for cram in (False, True):
+            yield from _generate(
+                f"calendar,courses={courses},cram={int(cram)},scorer=compiled",
+                make_request(courses, cram_mode=cram, calendar=True, scorer="compiled"),
+                quick=courses <= 20,
+            )
+    for topics in (0, 500):
+        yield from _generate(
+            f"weekly,courses=20,topics={topics},scorer=experta",
+            make_request(20, topics, scorer="experta"),
+            quick=topics == 0,
+        )
+    for topics in (500, 5000):
+        yield from _generate(
+            f"weekly,courses=20,topics={topics},scorer=vectorized",
+            make_request(20, topics, scorer="vectorized"),
+            quick=topics <= 500,
+        )
+
+
+def _engine_cases() -> Iterator[Case]:
+    for cram in (False, True):
+        yield Case(f"StudyEngine.__init__[cram={int(cram)}]", lambda _, cram=cram: StudyEngine(cram))
+    for topics in (10, 500, 5000):
+        facts = make_facts(topics)
+        engine = StudyEngine(False)
+        yield Case(
+            f"StudyEngine.score_topics[topics={topics}]",
+            lambda _, engine=engine, facts=facts: engine.score_topics(facts),
+            quick=topics <= 500,
+        )
+        compiled = CompiledStudyEngine(False)
+        yield Case(
+            f"CompiledStudyEngine.score_topics[topics={topics}]",
+            lambda _, engine=compiled, facts=facts: engine.score_topics(facts),
+        )
+
+
+def _fresh_registry(resp: Any) -> Callable[[], Any]:
+    # Stored without going through save(), so export rows are built inside the timed call
+    def setup() -> Any:
+        registry = ExportRegistry(MemoryScheduleStore())
+        registry.store.put("bench", resp)
+        return registry
+    return setup
+
+
+def _export_cases() -> Iterator[Case]:
+    workloads = {
+        "weekly,courses=20": generate_schedule(make_request(20)),
+        "calendar,courses=200": generate_schedule(make_request(200, calendar=True, scorer="compiled")),
+    }
+    for label, resp in workloads.items():
+        yield Case(f"export_csv[{label}]", lambda registry: registry.export_csv(registry.load("bench")), setup=_fresh_registry(resp))
+    for label, resp in workloads.items():
+        rows = allocation_rows(resp)
+        for backend, render in PDF_BACKENDS:
+            yield Case(
+                f"export_pdf[{backend},{label}]",
+                lambda _, render=render, resp=resp, rows=rows: render(resp, rows),
+                quick=label.startswith("weekly"),
+            )
+
+
+def _respond_model(store: MemoryScheduleStore, data: bytes) -> bytes:
+    resp = pickle.loads(data)
+    resp.schedule_id = store.add(resp)
+    return resp.model_dump_json().encode("utf-8")
+
+
+def _respond_payload(store: MemoryScheduleStore, data: bytes) -> bytes:
+    payload = pickle.loads(data)
+    store.add_payload(payload)
+    return dumps(payload)
+
+
+def _response_cases() -> Iterator[Case]:
+    # What the API process does with a worker's result: unpickle, store, serialize
+    for courses in (20, 200):
+        req = make_request(courses, calendar=True, scorer="compiled")
+        results = {"model": pickle.dumps(generate_schedule(req)), "payload": pickle.dumps(generate_payload(req))}
+        for kind, respond in (("model", _respond_model), ("payload", _respond_payload)):
+            yield Case(
+                f"respond[{kind},calendar,courses={courses}]",
+                lambda store, respond=respond, data=results[kind]: respond(store, data),
+                setup=MemoryScheduleStore,
+                quick=courses == 20,
+            )
+
+
+def all_cases() -> List[Case]:
+    return [*_generate_cases(), *_engine_cases(), *_export_cases(), *_response_cases()]
+
+
+def measure(case: Case, min_time: float = 0.2, min_repeat: int = 3, max_repeat: int = 50) -> Dict[str, Any]:
+    """Time `case` until `min_time` seconds or `max_repeat` calls have passed; one untimed warm-up call first."""
+    case.run(case.setup())
+    samples: List[float] = []
+    while len(samples) < min_repeat or (sum(samples) < min_time * 1000 and len(samples) < max_repeat):
+        arg = case.setup()
+        start = time.perf_counter()
+        case.run(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "min_ms": round(min(samples), 4),
+        "max_ms": round(max(samples), 4),
+        "repeat": len(samples),
+    }
+
+
+def run(cases: List[Case], min_time: float = 0.2) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for case in cases:
+        try:
+            results[case.name] = measure(case, min_time)
+        except (ImportError, OSError) as exc:
+            # Optional PDF libraries that aren't installed
+            results[case.name] = {"skipped": f"{type(exc).__name__}: {exc}"}
+        _print_result(case.name, results[case.name])
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+) -> List[str]:
+    """Cases whose median got slower than the baseline by more than `threshold` (and `min_delta_ms`)."""
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or "median_ms" not in before or "median_ms" not in result:
+            continue
+        delta = result["median_ms"] - before["median_ms"]
+        if delta > min_delta_ms and result["median_ms"] > before["median_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: {before['median_ms']:.3f} ms -> {result['median_ms']:.3f} ms "
+                f"(+{delta / before['median_ms']:.0%})"
+            )
+    return regressions
+
+
+def _print_result(name: str, result: Dict[str, Any]) -> None:
+    if "skipped" in result:
+        print(f"{name:<80} skipped ({result['skipped']})")
+    else:
+        print(f"{name:<80} {result['median_ms']:>10.3f} ms  (min {result['min_ms']:.3f}, n={result['repeat']})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.benchmarks",
+        description="Benchmark the scheduler, rule engines and exporters on synthetic workloads.",
+    )
+    parser.add_argument("--quick", action="store_true", help="skip the largest workloads")
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds to spend timing each case")
+    parser.add_argument("--output", help="write results as JSON (usable as a baseline)")
+    parser.add_argument("--compare", metavar="BASELINE", help="fail if any case regressed against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed relative slowdown (default 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    cases = [c for c in all_cases() if args.filter in c.name and (c.quick or not args.quick)]
+    current = run(cases, args.min_time)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(current, fh, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = compare(current, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions over {args.threshold:.0%} against {args.compare}")
+    return 0
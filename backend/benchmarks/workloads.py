@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import datetime as dt
+import random
+from typing import Any, Dict, List, Optional
+
+from ..app.models import GenerateRequest
+
+# Fixed so calendar workloads don't depend on the day they run
+START_DATE = dt.date(2026, 1, 5)
+EXAM_TYPES = ["mcq", "written", "practical", "oral"]
+
+
+def make_courses(n_courses: int, n_topics: int = 0, calendar: bool = False, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Synthetic course payloads. `n_topics` topics are spread over the courses;
+    each topic lists up to two earlier topics of its course as prerequisites.
+    With `calendar`, every course gets an exam 14-60 days after START_DATE.
+    """
+    rng = random.Random(seed)
+    courses: List[Dict[str, Any]] = []
+    for i in range(n_courses):
+        course: Dict[str, Any] = {
+            "name": f"Course {i:03d}",
+            "confidence_level": rng.randint(1, 5),
+            "credit_unit": rng.randint(1, 6),
+        }
+        if calendar:
+            course["exam_date"] = (START_DATE + dt.timedelta(days=rng.randint(14, 60))).isoformat()
+        courses.append(course)
+
+    for i, course in enumerate(courses):
+        count = n_topics // n_courses + (1 if i < n_topics % n_courses else 0)
+        topics = []
+        for t in range(count):
+            prereqs = rng.sample(range(t), min(t, rng.randint(0, 2)))
+            topics.append({
+                "name": f"T{t:04d}",
+                "prereqs": [f"T{p:04d}" for p in prereqs],
+                "est_hours": round(rng.uniform(0.5, 4.0), 1),
+            })
+        if topics:
+            course["topics"] = topics
+    return courses
+
+
+def make_request(
+    n_courses: int,
+    n_topics: int = 0,
+    cram_mode: bool = False,
+    calendar: bool = False,
+    scorer: Optional[str] = "simple",
+    seed: int = 0,
+) -> GenerateRequest:
+    return GenerateRequest.model_validate({
+        "student_name": "Benchmark Student",
+        "academic_level": "300L",
+        "semester": "First Semester",
+        "avg_hours_per_day": 6,
+        "courses": make_courses(n_courses, n_topics, calendar, seed),
+        "start_date": START_DATE.isoformat() if calendar else None,
+        "cram_mode": cram_mode,
+        "scorer": scorer,
+    })
+
+
+def make_facts(n_topics: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Topic facts covering every rule field, for scoring engines directly."""
+    rng = random.Random(seed)
+    return [
+        {
+            "course_id": f"Course {i % 20:03d}",
+            "topic_id": f"T{i:05d}",
+            "difficulty": round(rng.random(), 2),
+            "mastery": round(rng.random(), 2),
+            "importance": round(rng.uniform(0.8, 1.8), 2),
+            "exam_type": rng.choice(EXAM_TYPES),
+            "days_to_exam": rng.randint(0, 40),
+            "est_hours": round(rng.uniform(0.5, 20.0), 1),
+            "prereq_depth": rng.randint(0, 5),
+            "dependents": rng.randint(0, 5),
+        }
+        for i in range(n_topics)
+    ]
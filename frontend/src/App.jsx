@@ -18,7 +18,7 @@ function App() {
         ...prev,
         courses: [
           ...prev.courses,
-          { name: "", credit_unit: 3, confidence_level: 3 },
+          { name: "", credit_unit: 3, confidence_level: 3, exam_date: "" },
         ],
       };
       // Auto scroll to bottom after state updates in next tick
@@ -53,6 +53,20 @@ function App() {
     }
   };
 
+  // Download the current schedule as a file (binary response from the backend)
+  const downloadFile = async (kind) => {
+    const res = await fetch(`https://study-expert-system.onrender.com/api/download/${kind}/${schedule.schedule_id}`);
+    if (!res.ok) return alert("No schedule available yet.");
+    const blob = await res.blob();
+    const match = /filename="([^"]+)"/.exec(res.headers.get("Content-Disposition") || "");
+    const url = URL.createObjectURL(blob);
+    const a = document.createElement("a");
+    a.href = url;
+    a.download = match ? match[1] : `schedule.${kind}`;
+    a.click();
+    URL.revokeObjectURL(url);
+  };
+
   return (
     <div className="page">
       <div className="container">
@@ -165,6 +179,17 @@ function App() {
                       <option value={5}>5 - Very High</option>
                     </select>
                   </div>
+
+                  {/* Optional: with exam dates the backend plans day by day up to the last exam */}
+                  <div className="form-group">
+                    <label className="label">Exam Date</label>
+                    <input
+                      type="date"
+                      value={course.exam_date}
+                      onChange={(e) => updateCourse(ci, "exam_date", e.target.value)}
+                      className="input"
+                    />
+                  </div>
                 </div>
               </div>
             ))}
@@ -196,6 +221,7 @@ function App() {
                   <th>Day</th>
                   <th>Course</th>
                   <th>Hours</th>
+                  <th>Sessions</th>
                 </tr>
               </thead>
               <tbody>
@@ -203,10 +229,16 @@ function App() {
                   daily.allocations.map((alloc, ai) => (
                     <tr key={`${di}-${ai}`}>
                       {ai === 0 ? (
-                        <td rowSpan={daily.allocations.length}>{daily.day}</td>
+                        <td rowSpan={daily.allocations.length}>{daily.date ? `${daily.day} ${daily.date}` : daily.day}</td>
                       ) : null}
                       <td>{alloc.course}</td>
                       <td>{alloc.hours} hrs</td>
+                      <td>
+                        {(daily.sessions || [])
+                          .filter((session) => session.course === alloc.course)
+                          .map((session) => `${session.start.slice(0, 5)}–${session.end.slice(0, 5)}${session.topic ? ` ${session.topic}` : ""}`)
+                          .join(", ")}
+                      </td>
                     </tr>
                   ))
                 )}
@@ -217,18 +249,7 @@ function App() {
               <button
                 type="button"
                 className="button"
-                onClick={async () => {
-                  const res = await fetch("https://study-expert-system.onrender.com/api/download/csv");
-                  if (!res.ok) return alert("No schedule available yet.");
-                  const { filename, content, mime } = await res.json();
-                  const blob = new Blob([content], { type: mime });
-                  const url = URL.createObjectURL(blob);
-                  const a = document.createElement("a");
-                  a.href = url;
-                  a.download = filename;
-                  a.click();
-                  URL.revokeObjectURL(url);
-                }}
+                onClick={() => downloadFile("csv")}
               >
                 Download CSV
               </button>
@@ -236,21 +257,7 @@ function App() {
               <button
                 type="button"
                 className="button"
-                onClick={async () => {
-                  const res = await fetch("https://study-expert-system.onrender.com/api/download/pdf");
-                  if (!res.ok) return alert("No schedule available yet.");
-                  const { filename, content_base64, mime } = await res.json();
-                  const byteChars = atob(content_base64);
-                  const byteNumbers = new Array(byteChars.length);
-                  for (let i = 0; i < byteChars.length; i++) byteNumbers[i] = byteChars.charCodeAt(i);
-                  const blob = new Blob([new Uint8Array(byteNumbers)], { type: mime });
-                  const url = URL.createObjectURL(blob);
-                  const a = document.createElement("a");
-                  a.href = url;
-                  a.download = filename;
-                  a.click();
-                  URL.revokeObjectURL(url);
-                }}
+                onClick={() => downloadFile("pdf")}
               >
                 Download PDF
               </button>
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from backend.app.allocator import allocate_units
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_allocate_units_sums_and_limits(seed):
+    rng = random.Random(seed)
+    names = [f"C{i}" for i in range(rng.randint(1, 8))]
+    priorities = {name: rng.choice([0.0, rng.random() * 5]) for name in names}
+    units = rng.randint(0, 30)
+    minimum = {name: rng.randint(0, 2) for name in names if rng.random() < 0.5}
+    while sum(minimum.values()) > units:
+        minimum.popitem()
+    maximum = {name: minimum.get(name, 0) + rng.randint(0, 6) for name in names if rng.random() < 0.5}
+    credit = {}
+
+    for _ in range(5):
+        result = allocate_units(priorities, units, minimum, maximum, credit)
+        assert sorted(result) == sorted(names)
+        assert all(result[name] >= minimum.get(name, 0) for name in names)
+        assert all(result[name] <= maximum[name] for name in maximum)
+        capacity = sum(maximum.get(name, units) for name in names)
+        assert sum(result.values()) == min(units, capacity)
+
+
+def test_allocate_units_follows_priority():
+    result = allocate_units({"a": 3.0, "b": 1.0}, 8)
+    assert result == {"a": 6, "b": 2}
+
+
+def test_allocate_units_rejects_minimums_above_budget():
+    with pytest.raises(ValueError):
+        allocate_units({"a": 1.0, "b": 1.0}, 3, minimum={"a": 2, "b": 2})
@@ -0,0 +1,54 @@
+import os
+
+from backend.app.exporters import PdfCache
+
+
+def _spilled(spill_dir):
+    return sorted(name[:-len(".pdf")] for name in os.listdir(spill_dir))
+
+
+def test_spill_dir_is_bounded(tmp_path):
+    cache = PdfCache(max_bytes=10, spill_dir=str(tmp_path), spill_bytes=30)
+    for key in "abcdef":
+        cache.put(key, b"x" * 10)
+
+    # "f" is in memory; "a".."e" were evicted, but only the last 30 bytes stay on disk
+    assert _spilled(tmp_path) == ["c", "d", "e"]
+    assert cache.spill_size == 30
+    assert cache.get("a") is None
+    assert cache.get("c") == b"x" * 10
+
+
+def test_spill_dir_evicts_least_recently_used(tmp_path):
+    cache = PdfCache(max_bytes=10, spill_dir=str(tmp_path), spill_bytes=30)
+    for key in "abcd":
+        cache.put(key, b"x" * 10)
+    assert _spilled(tmp_path) == ["a", "b", "c"]
+
+    assert cache.get("a") == b"x" * 10  # read back, so "b" is now the oldest file
+    cache.put("e", b"x" * 10)
+    cache.put("f", b"x" * 10)
+
+    assert "a" in _spilled(tmp_path) and "b" not in _spilled(tmp_path)
+    assert cache.spill_size <= 30
+
+
+def test_spill_dir_left_by_earlier_run_is_trimmed(tmp_path):
+    for i, key in enumerate("abcd"):
+        path = tmp_path / f"{key}.pdf"
+        path.write_bytes(b"x" * 10)
+        os.utime(path, (i, i))
+
+    cache = PdfCache(max_bytes=10, spill_dir=str(tmp_path), spill_bytes=20)
+
+    assert _spilled(tmp_path) == ["c", "d"]
+    assert cache.spill_size == 20
+
+
+def test_pdf_larger_than_spill_limit_is_not_written(tmp_path):
+    cache = PdfCache(max_bytes=10, spill_dir=str(tmp_path), spill_bytes=5)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+
+    assert _spilled(tmp_path) == []
+    assert cache.get("a") is None
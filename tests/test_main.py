@@ -0,0 +1,328 @@
+import asyncio
+import base64
+import json
+import os
+import pstats
+import subprocess
+import sys
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import main
+from backend.app.config import RETRY_AFTER_SECONDS
+from backend.app.exporters import ExportRegistry
+from backend.app.response_cache import ResponseCache
+from backend.app.store import MemoryScheduleStore
+from backend.app.workers import WorkerPool
+
+
+def _payload(**overrides):
+    payload = {
+        "student_name": "Test Student",
+        "academic_level": "200L",
+        "semester": "First Semester",
+        "avg_hours_per_day": 2,
+        "courses": [
+            {"name": "Mathematics", "confidence_level": 2, "credit_unit": 3},
+            {"name": "Physics", "confidence_level": 4, "credit_unit": 2},
+        ],
+    }
+    payload.update(overrides)
+    return payload
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Fresh stores per test; jobs run in the event loop's thread pool instead of worker processes
+    monkeypatch.setattr(main, "scheduler_pool", WorkerPool(workers=0))
+    monkeypatch.setattr(main, "export_registry", ExportRegistry(MemoryScheduleStore()))
+    monkeypatch.setattr(main, "response_cache", ResponseCache())
+    monkeypatch.setattr(main, "PDF_WARMUP", "lazy")
+    with TestClient(main.app) as client:
+        yield client
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def test_store_is_used_off_the_event_loop(client, monkeypatch):
+    store = main.export_registry.store
+    calls = []
+    for name in ("put", "get_entry"):
+        def checked(*args, _original=getattr(store, name), _name=name):
+            calls.append((_name, _on_event_loop()))
+            return _original(*args)
+        monkeypatch.setattr(store, name, checked)
+
+    schedule_id = client.post("/api/generate", json=_payload()).json()["schedule_id"]
+    assert client.post("/api/generate", json=_payload()).headers["X-Cache"] == "HIT"
+    assert client.patch(f"/api/schedules/{schedule_id}", json={"avg_hours_per_day": 3}).status_code == 200
+
+    assert {name for name, _ in calls} == {"put", "get_entry"}
+    assert not any(on_loop for _, on_loop in calls)
+
+
+def test_metrics_endpoint_reports_stages_and_rule_fires(client, monkeypatch):
+    monkeypatch.setattr(main.METRICS, "enabled", True)
+    assert client.post("/api/generate", json=_payload(scorer="compiled")).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'study_stage_duration_seconds_count{stage="store"}' in body
+    assert 'study_stage_duration_seconds_count{stage="rules"}' in body
+    assert 'study_rule_fires_total{engine="compiled",' in body
+    assert 'study_scorer_calls{scorer="compiled"}' in body
+
+
+def test_metrics_endpoint_is_off_when_disabled(client, monkeypatch):
+    monkeypatch.setattr(main.METRICS, "enabled", False)
+    assert client.get("/metrics").status_code == 404
+
+
+@pytest.mark.parametrize("kind", ["csv", "pdf"])
+def test_download_reads_the_store_once(client, monkeypatch, kind):
+    schedule_id = client.post("/api/generate", json=_payload()).json()["schedule_id"]
+    store = main.export_registry.store
+    lookups = []
+    original = store.get_entry
+    monkeypatch.setattr(store, "get_entry", lambda schedule_id: lookups.append(schedule_id) or original(schedule_id))
+
+    assert client.get(f"/api/download/{kind}/{schedule_id}").status_code == 200
+    assert lookups == [schedule_id]
+    assert client.get(f"/api/download/{kind}/missing").status_code == 404
+
+
+def test_busy_scheduler_answers_503_with_retry_after(client):
+    main.scheduler_pool.pending = main.scheduler_pool.max_pending
+
+    for response in (
+        client.post("/api/generate", json=_payload()),
+        client.post("/api/generate/batch", json=[_payload()]),
+    ):
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(RETRY_AFTER_SECONDS)
+
+
+@pytest.mark.parametrize("error, status", [
+    (ValueError("bad input"), 400),
+    (BrokenProcessPool("worker died"), 503),
+    (RuntimeError("bug"), 500),
+])
+def test_scheduler_errors_map_to_status(client, monkeypatch, error, status):
+    def fail(req):
+        raise error
+    monkeypatch.setattr(main, "generate_schedule", fail)
+
+    response = client.post("/api/generate", json=_payload())
+    assert response.status_code == status
+    assert ("Retry-After" in response.headers) == (status == 503)
+
+
+def _crash():
+    os._exit(1)
+
+
+def test_worker_pool_restarts_after_a_crash():
+    pool = WorkerPool(workers=1)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            asyncio.run(pool.run(_crash))
+        assert asyncio.run(pool.run(os.getpid)) != os.getpid()
+    finally:
+        pool.shutdown()
+
+
+def test_batch_streams_one_ndjson_line_per_student(client):
+    over_budget = _payload(courses=[{"name": "Mathematics", "confidence_level": 2, "credit_unit": 3, "min_hours_per_day": 5}])
+    items = [_payload(), {"student_name": "No courses"}, over_budget]
+
+    response = client.post("/api/generate/batch", json=items)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = {line["index"]: line for line in map(json.loads, response.text.splitlines())}
+
+    assert sorted(lines) == [0, 1, 2]
+    assert lines[1]["error"].startswith("Invalid request")
+    assert "exceed the daily study hours" in lines[2]["error"]
+    schedule_id = lines[0]["result"]["schedule_id"]
+    assert client.get(f"/api/download/csv/{schedule_id}").status_code == 200
+    # Stored with its base weights, so it can be re-planned
+    assert client.patch(f"/api/schedules/{schedule_id}", json={"avg_hours_per_day": 3}).status_code == 200
+
+
+@pytest.mark.parametrize("accept_encoding, gzipped", [
+    ("gzip", True),
+    ("deflate, gzip;q=0.5", True),
+    ("*", True),
+    ("gzip;q=0", False),
+    ("gzip;q=0, *", False),
+    ("*;q=0", False),
+    ("identity", False),
+])
+def test_csv_download_honours_accept_encoding(client, accept_encoding, gzipped):
+    schedule_id = client.post("/api/generate", json=_payload()).json()["schedule_id"]
+
+    response = client.get(f"/api/download/csv/{schedule_id}", headers={"Accept-Encoding": accept_encoding})
+    assert response.status_code == 200
+    assert (response.headers.get("Content-Encoding") == "gzip") == gzipped
+    assert response.headers["ETag"].endswith('-gz"') == gzipped
+    assert response.text.startswith("Day,Course,Hours")
+
+
+def test_app_import_leaves_optional_scorer_libraries_unloaded():
+    # Experta and NumPy load on first use of their scorers
+    code = "import sys, backend.app.main; print(sorted({'experta', 'numpy'} & set(sys.modules)))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_pdf_download_is_a_binary_attachment_with_etag(client):
+    schedule_id = client.post("/api/generate", json=_payload()).json()["schedule_id"]
+
+    response = client.get(f"/api/download/pdf/{schedule_id}")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.headers["Content-Disposition"] == 'attachment; filename="Test_Student_schedule.pdf"'
+    assert response.content.startswith(b"%PDF")
+
+    etag = response.headers["ETag"]
+    cached = client.get(f"/api/download/pdf/{schedule_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.content == b""
+    stale = client.get(f"/api/download/pdf/{schedule_id}", headers={"If-None-Match": '"other"'})
+    assert stale.status_code == 200
+
+
+def test_csv_download_revalidates_with_etag(client):
+    schedule_id = client.post("/api/generate", json=_payload()).json()["schedule_id"]
+    headers = {"Accept-Encoding": "identity"}
+
+    response = client.get(f"/api/download/csv/{schedule_id}", headers=headers)
+    assert response.headers["Content-Disposition"] == 'attachment; filename="Test_Student_schedule.csv"'
+    cached = client.get(f"/api/download/csv/{schedule_id}", headers=dict(headers, **{"If-None-Match": response.headers["ETag"]}))
+    assert cached.status_code == 304
+
+
+def test_downloads_keep_the_json_shape_on_request(client):
+    schedule_id = client.post("/api/generate", json=_payload()).json()["schedule_id"]
+
+    csv_body = client.get(f"/api/download/csv/{schedule_id}", params={"format": "json"}).json()
+    assert csv_body["mime"] == "text/csv" and csv_body["content"].startswith("Day,Course,Hours")
+    pdf_body = client.get(f"/api/download/pdf/{schedule_id}", params={"format": "json"}).json()
+    assert pdf_body["mime"] == "application/pdf"
+    assert base64.b64decode(pdf_body["content_base64"]).startswith(b"%PDF")
+
+
+def test_replan_stores_a_new_schedule_and_returns_changed_days(client):
+    original = client.post("/api/generate", json=_payload()).json()
+    patch = {"courses": [{"name": "Chemistry", "confidence_level": 1, "credit_unit": 3}], "days_completed": 2}
+
+    response = client.patch(f"/api/schedules/{original['schedule_id']}", json=patch)
+    assert response.status_code == 200
+    delta = response.json()
+    assert delta["base_schedule_id"] == original["schedule_id"]
+    assert delta["schedule_id"] != original["schedule_id"]
+    assert "Chemistry" in delta["per_course_hours"]
+    assert delta["changed_days"] and all(change["index"] >= 2 for change in delta["changed_days"])
+    # Both versions stay downloadable
+    for schedule_id in (original["schedule_id"], delta["schedule_id"]):
+        assert client.get(f"/api/download/csv/{schedule_id}").status_code == 200
+
+
+def test_replan_errors(client):
+    schedule_id = client.post("/api/generate", json=_payload()).json()["schedule_id"]
+    unplanned_id = main.export_registry.save(main.export_registry.store.get(schedule_id))
+
+    assert client.patch("/api/schedules/missing", json={}).status_code == 404
+    assert client.patch(f"/api/schedules/{unplanned_id}", json={}).status_code == 409
+    response = client.patch(f"/api/schedules/{schedule_id}", json={"remove_courses": ["Biology"]})
+    assert response.status_code == 400 and "Unknown course(s): Biology" in response.json()["detail"]
+    assert client.patch(f"/api/schedules/{schedule_id}", json={"avg_hours_per_day": 0}).status_code == 422
+
+
+def test_profiling_needs_the_admin_token(client, monkeypatch):
+    assert client.post("/api/generate", params={"profile": 1}, json=_payload()).status_code == 403
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+
+    response = client.post("/api/generate", params={"profile": 1}, json=_payload(), headers={"X-Admin-Token": "wrong"})
+    assert response.status_code == 403
+    assert client.get("/api/profiles/anything").status_code == 403
+
+
+def test_profiled_requests_can_be_downloaded(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    admin = {"X-Admin-Token": "secret"}
+
+    response = client.post("/api/generate", params={"profile": 1}, json=_payload(), headers=admin)
+    assert response.status_code == 200
+    body = response.json()
+    profile_id = response.headers["X-Profile-Id"]
+    assert body["profile"]["profile_id"] == profile_id and body["profile"]["top"]
+    assert body["schedule_id"]
+
+    summary = client.get(f"/api/profiles/{profile_id}", params={"format": "json"}, headers=admin).json()
+    assert summary["label"] == "generate for 'Test Student'"
+    raw = client.get(f"/api/profiles/{profile_id}", headers=admin)
+    path = tmp_path / "generate.prof"
+    path.write_bytes(raw.content)
+    assert pstats.Stats(str(path)).total_calls > 0
+    assert client.get("/api/profiles/missing", headers=admin).status_code == 404
+
+    pdf = client.get(f"/api/download/pdf/{body['schedule_id']}", params={"profile": 1}, headers=admin)
+    assert pdf.status_code == 200 and pdf.headers["X-Profile-Id"] != profile_id
+
+
+def test_identical_requests_are_answered_from_the_response_cache(client):
+    first = client.post("/api/generate", json=_payload())
+    assert first.headers["X-Cache"] == "MISS"
+    payload = _payload()
+    payload["courses"].reverse()
+
+    second = client.post("/api/generate", json=payload)
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.content == first.content
+    assert client.post("/api/generate", json=_payload(avg_hours_per_day=3)).headers["X-Cache"] == "MISS"
+
+
+def test_cached_response_is_regenerated_once_its_schedule_expired(client, monkeypatch):
+    first = client.post("/api/generate", json=_payload()).json()
+    monkeypatch.setattr(main.export_registry.store, "get_entry", lambda schedule_id: None)
+
+    second = client.post("/api/generate", json=_payload())
+    assert second.headers["X-Cache"] == "MISS"
+    assert second.json()["schedule_id"] != first["schedule_id"]
+
+
+def test_response_cache_can_be_disabled(client, monkeypatch):
+    monkeypatch.setattr(main, "response_cache", ResponseCache(maxsize=0))
+    client.post("/api/generate", json=_payload())
+    assert client.post("/api/generate", json=_payload()).headers["X-Cache"] == "MISS"
+
+
+def test_fast_responses_keep_the_response_shape(client, monkeypatch):
+    slow = client.post("/api/generate", json=_payload()).json()
+    monkeypatch.setattr(main, "FAST_RESPONSES", True)
+    monkeypatch.setattr(main, "response_cache", ResponseCache())
+
+    response = client.post("/api/generate", json=_payload())
+    assert response.status_code == 200 and response.headers["X-Cache"] == "MISS"
+    fast = response.json()
+    assert fast["schedule_id"] != slow["schedule_id"]
+    for body in (fast, slow):
+        body.pop("schedule_id"), body.pop("scoring_ms")
+    assert fast == slow
+
+    schedule_id = response.json()["schedule_id"]
+    assert client.get(f"/api/download/csv/{schedule_id}").status_code == 200
+    assert client.patch(f"/api/schedules/{schedule_id}", json={"avg_hours_per_day": 3}).status_code == 200
+    batch = client.post("/api/generate/batch", json=[_payload()])
+    assert json.loads(batch.text)["result"]["schedule_id"]
@@ -0,0 +1,28 @@
+import pytest
+from pydantic import ValidationError
+
+from backend.app.models import Course
+
+
+def _course(topics):
+    return {"name": "Algebra", "confidence_level": 3, "credit_unit": 2, "topics": topics}
+
+
+def test_topics_in_a_dag_are_accepted():
+    course = Course.model_validate(_course([{"name": "a"}, {"name": "b", "prereqs": ["a"]}, {"name": "c", "prereqs": ["a", "b"]}]))
+    assert [topic.name for topic in course.topics] == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize("topics", [
+    [{"name": "a", "prereqs": ["a"]}],
+    [{"name": "a", "prereqs": ["b"]}, {"name": "b", "prereqs": ["a"]}],
+    [{"name": "a", "prereqs": ["c"]}, {"name": "b", "prereqs": ["a"]}, {"name": "c", "prereqs": ["b"]}],
+])
+def test_prerequisite_cycles_are_rejected(topics):
+    with pytest.raises(ValidationError, match="cycle"):
+        Course.model_validate(_course(topics))
+
+
+def test_unknown_prerequisites_are_rejected():
+    with pytest.raises(ValidationError):
+        Course.model_validate(_course([{"name": "a", "prereqs": ["missing"]}]))
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from backend.app import rule_table
+from backend.app.metrics import Metrics
+from backend.app.rule_table import COMPILED_RULES, CompiledStudyEngine, ScoreCache
+from backend.app.rules import StudyEngine
+from backend.app.scoring import SCORERS
+from backend.benchmarks.workloads import make_facts
+
+
+def test_score_cache_key_determines_fired_rules():
+    cache = ScoreCache()
+    facts = make_facts(2000, seed=3)
+    rng = random.Random(3)
+    for fact in facts[::4]:
+        del fact[rng.choice(sorted(fact))]
+    by_key = {}
+    for fact in facts:
+        fired = [rule_id for rule_id, _, _ in COMPILED_RULES.match(fact)]
+        assert by_key.setdefault(cache.key(fact, False), fired) == fired
+
+
+def test_score_cache_key_ignores_values_within_a_bucket():
+    cache = ScoreCache()
+    fact = {"topic_id": "t", "days_to_exam": 30, "mastery": 0.41, "est_hours": 6.3}
+    moved = dict(fact, topic_id="u", days_to_exam=29, mastery=0.52, est_hours=5.0)
+    crossed = dict(fact, mastery=0.56)
+    assert cache.key(fact, False) == cache.key(moved, False)
+    assert cache.key(fact, False) != cache.key(crossed, False)
+    assert cache.key(fact, False) != cache.key(fact, True)
+
+
+def _random_facts(n, seed):
+    # Values drawn around the rule boundaries, with some fields left out
+    rng = random.Random(seed)
+    facts = make_facts(n, seed=seed)
+    for fact in facts:
+        fact["mastery"] = rng.choice([fact["mastery"], 0.15, 0.35, 0.55, 0.75, 0.85])
+        fact["days_to_exam"] = rng.choice([fact["days_to_exam"], -1, 2, 4, 8, 15, 21, 31])
+        fact["est_hours"] = rng.choice([fact["est_hours"], 16.0, 15.99])
+        for field in rng.sample(["difficulty", "importance", "exam_type", "prereq_depth", "dependents"], rng.randint(0, 2)):
+            del fact[field]
+    return facts
+
+
+@pytest.mark.parametrize("cram_mode", [False, True])
+def test_compiled_engine_matches_experta(cram_mode):
+    facts = _random_facts(750, seed=int(cram_mode))
+    expected = StudyEngine(cram_mode).score_topics(facts)
+    actual = CompiledStudyEngine(cram_mode).score_topics(facts)
+
+    assert actual.keys() == expected.keys()
+    for topic_id, adjustments in expected.items():
+        assert {a[0] for a in actual[topic_id]} == {a[0] for a in adjustments}, topic_id
+        assert sum(a[1] for a in actual[topic_id]) == pytest.approx(sum(a[1] for a in adjustments))
+
+
+def test_vectorized_scorer_matches_compiled():
+    facts = _random_facts(500, seed=7)
+    expected = CompiledStudyEngine(False).score_topics(facts)
+    actual = SCORERS["vectorized"].adjustments(facts, False)
+    assert actual == expected
+
+
+def test_rule_fires_count_cache_hits(monkeypatch):
+    metrics = Metrics(enabled=True)
+    monkeypatch.setattr(rule_table, "METRICS", metrics)
+    facts = _random_facts(200, 5)
+    cache = ScoreCache()
+
+    first = cache.score_topics(CompiledStudyEngine(False), facts)
+    cache.score_topics(CompiledStudyEngine(False), facts)
+
+    fires = {}
+    for fired in first.values():
+        for rule_id, _, _ in fired:
+            fires[rule_id] = fires.get(rule_id, 0) + 2
+    assert fires
+    for rule_id, count in fires.items():
+        assert metrics.counter("study_rule_fires_total", rule_id=rule_id, engine="compiled") == count
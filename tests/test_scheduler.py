@@ -0,0 +1,84 @@
+import pytest
+from pydantic import ValidationError
+
+from backend.app.models import GenerateRequest
+from backend.app.scheduler import course_weights, generate_batch, generate_schedule
+
+
+def _request(**overrides):
+    payload = {
+        "student_name": "Test Student",
+        "academic_level": "200L",
+        "semester": "First Semester",
+        "avg_hours_per_day": 2,
+        "courses": [
+            {"name": "Mathematics", "confidence_level": 2, "credit_unit": 3, "min_hours_per_day": 0.5},
+            {"name": "Physics", "confidence_level": 4, "credit_unit": 2, "min_hours_per_day": 0.5},
+        ],
+    }
+    payload.update(overrides)
+    return GenerateRequest.model_validate(payload)
+
+
+def test_minimums_skipped_on_days_without_availability():
+    req = _request(availability=[{"start": "18:00", "end": "22:00", "days": ["Monday", "Wednesday"]}])
+    resp = generate_schedule(req)
+
+    by_day = {daily.day: daily for daily in resp.schedule}
+    for day in ("Monday", "Wednesday"):
+        hours = {alloc.course: alloc.hours for alloc in by_day[day].allocations}
+        assert all(hours.get(name, 0) >= 0.5 for name in ("Mathematics", "Physics"))
+    assert by_day["Tuesday"].allocations == [] and by_day["Tuesday"].sessions == []
+    assert any("Minimum hours per course are skipped on Tuesday" in note for note in resp.notes)
+
+
+def test_window_shorter_than_a_session():
+    req = _request(availability=[{"start": "18:00", "end": "18:20"}])
+    resp = generate_schedule(req)
+
+    assert resp.total_weekly_hours == 0
+    assert all(not daily.sessions for daily in resp.schedule)
+
+
+def test_minimums_above_daily_hours_are_rejected():
+    with pytest.raises(ValueError, match="Minimum hours per day"):
+        generate_schedule(_request(avg_hours_per_day=0.5))
+
+
+def test_unknown_day_names_are_rejected():
+    with pytest.raises(ValidationError):
+        _request(availability=[{"start": "18:00", "end": "20:00", "days": ["Thurs"]}])
+
+
+def test_sessions_may_end_at_midnight():
+    req = _request(availability=[{"start": "23:00", "end": "00:00"}], session_minutes=25, break_minutes=10)
+    resp = generate_schedule(req)
+
+    sessions = [session for daily in resp.schedule for session in daily.sessions]
+    assert sessions
+    for session in sessions:
+        end = session.end.hour * 60 + session.end.minute or 24 * 60
+        assert end - (session.start.hour * 60 + session.start.minute) == 25
+
+
+def test_every_allocated_session_is_placed_in_close_windows():
+    # The break after 18:00-19:00 runs into 19:05-19:30
+    req = _request(
+        avg_hours_per_day=3,
+        availability=[{"start": "18:00", "end": "19:00"}, {"start": "19:05", "end": "19:30"}],
+    )
+    resp = generate_schedule(req)
+
+    for daily in resp.schedule:
+        allocated = round(sum(alloc.hours for alloc in daily.allocations) * 60 / req.session_minutes)
+        assert allocated == len(daily.sessions) == 2
+
+
+def test_batch_returns_weights_with_each_result():
+    req = _request()
+    bad = _request(avg_hours_per_day=0.5, courses=[{"name": "Mathematics", "confidence_level": 2, "credit_unit": 3, "min_hours_per_day": 1}])
+
+    (first, _, weights, error), (second, result, no_weights, failed) = generate_batch([(0, req), (1, bad)])
+    assert (first, second) == (0, 1)
+    assert error is None and weights == course_weights(req.courses)
+    assert result is None and no_weights is None and failed
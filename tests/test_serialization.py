@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from backend.app import serialization
+from backend.app.models import GenerateRequest
+from backend.app.scheduler import generate_payload, generate_schedule
+
+
+def _request():
+    return GenerateRequest.model_validate({
+        "student_name": "Tést Student",
+        "academic_level": "200L",
+        "semester": "First Semester",
+        "avg_hours_per_day": 2,
+        "start_date": "2030-01-06",
+        "courses": [
+            {"name": "Mathematics", "confidence_level": 2, "credit_unit": 3, "exam_date": "2030-01-20"},
+            {"name": "Physics", "confidence_level": 4, "credit_unit": 2},
+        ],
+        "availability": [{"start": "18:00", "end": "00:00"}],
+    })
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_payload_serializes_like_the_model(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    req = _request()
+    payload = generate_payload(req)
+    expected = json.loads(generate_schedule(req).model_dump_json())
+
+    actual = json.loads(serialization.dumps(payload))
+    for body in (actual, expected):
+        body.pop("scoring_ms")
+    assert actual == expected
@@ -0,0 +1,56 @@
+import pytest
+
+from backend.app.models import GenerateRequest, StoredPlan
+from backend.app.scheduler import course_weights, generate_payload, generate_schedule
+from backend.app.store import MemoryScheduleStore, ScheduleStore, SqliteScheduleStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "memory":
+            return MemoryScheduleStore(**kwargs)
+        return SqliteScheduleStore(str(tmp_path / "schedules.db"), **kwargs)
+    return make
+
+
+def _request(name="Test Student"):
+    return GenerateRequest.model_validate({
+        "student_name": name,
+        "academic_level": "200L",
+        "semester": "First Semester",
+        "avg_hours_per_day": 2,
+        "courses": [{"name": "Mathematics", "confidence_level": 2, "credit_unit": 3}],
+    })
+
+
+def test_store_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        ScheduleStore()
+
+
+def test_schedules_are_kept_per_id_with_their_plan(make):
+    store = make()
+    first, second = _request("First"), _request("Second")
+    plan = StoredPlan(request=first, weights=course_weights(first.courses))
+    first_id = store.add(generate_schedule(first), plan)
+    second_id = store.add_payload(generate_payload(second))
+
+    resp, stored_plan = store.get_entry(first_id)
+    assert resp.schedule_id == first_id and resp.student_name == "First"
+    assert stored_plan == plan
+    resp, stored_plan = store.get_entry(second_id)
+    assert resp.schedule_id == second_id and resp.student_name == "Second"
+    assert stored_plan is None
+    assert second_id in store and "missing" not in store
+
+
+def test_oldest_schedules_are_dropped_beyond_maxsize(make):
+    store = make(maxsize=2)
+    ids = [store.add(generate_schedule(_request(f"S{i}"))) for i in range(3)]
+    assert [schedule_id in store for schedule_id in ids] == [False, True, True]
+
+
+def test_schedules_expire(make):
+    store = make(ttl=-1)
+    assert store.add(generate_schedule(_request())) not in store
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from backend.app.timetable import FreeSlots, plan_sessions, to_minutes
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_sessions_stay_in_windows_and_never_overlap(seed):
+    rng = random.Random(seed)
+    windows = []
+    for _ in range(rng.randint(1, 4)):
+        start = rng.randrange(0, 23 * 60, 5)
+        windows.append((start, min(24 * 60, start + rng.randrange(20, 300, 5))))
+    session_minutes, break_minutes = rng.choice([25, 30, 50]), rng.choice([0, 5, 10])
+    hours = {f"C{i}": rng.randint(0, 6) * session_minutes / 60 for i in range(rng.randint(1, 5))}
+
+    sessions, unplaced = plan_sessions(hours, FreeSlots(windows), session_minutes, break_minutes)
+
+    spans = sorted((to_minutes(s.start), to_minutes(s.end) or 24 * 60) for s in sessions)
+    for start, end in spans:
+        assert end - start == session_minutes
+        assert any(lo <= start and end <= hi for lo, hi in windows)
+    for (_, end), (next_start, _) in zip(spans, spans[1:]):
+        assert next_start >= end + break_minutes
+    placed = {name: 0 for name in hours}
+    for session in sessions:
+        placed[session.course] += 1
+    for name, h in hours.items():
+        assert placed[name] + unplaced.get(name, 0) == round(h * 60 / session_minutes)
+
+
+def test_capacity_carries_break_across_close_windows():
+    # 18:00-19:00 ends with a break that runs into 19:05-19:30
+    slots = FreeSlots([(18 * 60, 19 * 60), (19 * 60 + 5, 19 * 60 + 30)])
+    assert slots.capacity(25, 10) == 2
+
+    sessions, unplaced = plan_sessions({"A": 50 / 60, "B": 25 / 60}, slots, 25, 10)
+    assert len(sessions) == 2 and sum(unplaced.values()) == 1
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_capacity_matches_what_plan_sessions_places(seed):
+    rng = random.Random(seed)
+    windows = []
+    for _ in range(rng.randint(1, 4)):
+        start = rng.randrange(0, 23 * 60, 5)
+        windows.append((start, min(24 * 60, start + rng.randrange(5, 120, 5))))
+    session_minutes, break_minutes = rng.choice([20, 25, 30]), rng.choice([0, 5, 10, 15, 30])
+    fits = FreeSlots(windows).capacity(session_minutes, break_minutes)
+
+    sessions, unplaced = plan_sessions({"A": 24.0}, FreeSlots(windows), session_minutes, break_minutes)
+    assert len(sessions) == fits